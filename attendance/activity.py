@@ -0,0 +1,98 @@
+"""
+Append-only course activity feed.
+
+The code paths that mark attendance or accept a submission record an
+ActivityEvent alongside it. Feeds then read one page of events for a set of
+courses with a single keyset-paginated query over the (course, created_at,
+id) index, however many kinds of activity there are. A page's cursor is the
+(created_at, id) of its last event, so pages stay stable while new events
+arrive at the top.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import ActivityEvent
+
+# Events per feed page
+PAGE_SIZE = 20
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def attendance_marked(records, when=None):
+    """Record an event for each AttendanceRecord; ``record.session`` must be set"""
+    when = when or timezone.now()
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(
+            course_id=record.session.course_id,
+            event_type=ActivityEvent.ATTENDANCE,
+            student_id=record.student_id,
+            data={
+                'status': bool(record.status),
+                'session_id': record.session_id,
+                'session_date': str(record.session.date),
+            },
+            created_at=when
+        ) for record in records
+    ])
+
+
+def assignment_submitted(submission):
+    ActivityEvent.objects.create(
+        course_id=submission.assignment.course_id,
+        event_type=ActivityEvent.SUBMISSION,
+        student_id=submission.student_id,
+        data={
+            'assignment_id': submission.assignment_id,
+            'assignment_title': submission.assignment.title,
+        },
+        created_at=submission.submitted_at
+    )
+
+
+def encode_cursor(event):
+    microseconds = (event.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f'{microseconds}-{event.id}'
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises ValueError if it is malformed"""
+    microseconds, pk = cursor.split('-')
+    return _EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+
+
+def feed(course_ids, cursor=None, limit=PAGE_SIZE):
+    """One page of the courses' events, newest first.
+
+    Returns (events, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    course_ids = sorted(set(course_ids))
+    events = ActivityEvent.objects.all()
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        # The plain bound on created_at keeps this an index range scan
+        events = events.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+    if len(course_ids) == 1:
+        events = events.filter(course_id=course_ids[0])
+    else:
+        # SQLite can't merge several index ranges in order, so ordering all of
+        # the courses' events would sort their whole history. Take the newest
+        # page of each course from the index instead and order only those.
+        arms = [
+            events.filter(course_id=course_id).order_by('-created_at', '-id').values('id')[:limit + 1].query.sql_with_params()
+            for course_id in course_ids
+        ]
+        newest = RawSQL(
+            ' UNION ALL '.join(f'SELECT * FROM ({sql})' for sql, _ in arms) or 'SELECT NULL WHERE 0',
+            [param for _, params in arms for param in params]
+        )
+        events = ActivityEvent.objects.filter(id__in=newest)
+
+    page = list(events.select_related('course', 'student__user').order_by('-created_at', '-id')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
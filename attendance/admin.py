@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Student, Faculty, Course, AttendanceSession, AttendanceRecord
+from .models import User, Student, Faculty, Course, Enrollment, AttendanceSession, AttendanceRecord, AttendanceSummary, CourseNotification, OutboxEmail
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('email', 'first_name', 'last_name', 'user_type', 'is_active', 'is_staff')
@@ -18,10 +18,17 @@ class FacultyAdmin(admin.ModelAdmin):
     list_filter = ('department',)
     search_fields = ('faculty_id', 'user__email', 'user__first_name', 'user__last_name')
 
+class EnrollmentInline(admin.TabularInline):
+    model = Enrollment
+    raw_id_fields = ('student',)
+    readonly_fields = ('enrolled_at',)
+    extra = 0
+
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('course_code', 'name', 'faculty', 'created_at')
     list_filter = ('faculty',)
     search_fields = ('course_code', 'name', 'faculty__user__email')
+    inlines = [EnrollmentInline]
 
 class AttendanceSessionAdmin(admin.ModelAdmin):
     list_display = ('course', 'date', 'start_time', 'end_time', 'created_by')
@@ -35,9 +42,27 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
     search_fields = ('student__user__email', 'session__course__course_code')
     date_hierarchy = 'marked_at'
 
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'present', 'total', 'last_marked')
+    list_filter = ('course',)
+    search_fields = ('student__student_id', 'student__user__email', 'course__course_code')
+
+class CourseNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'course', 'notification_type', 'session', 'created_at')
+    list_filter = ('notification_type', 'course')
+    search_fields = ('title', 'course__course_code')
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'job_id')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Student, StudentAdmin)
 admin.site.register(Faculty, FacultyAdmin)
 admin.site.register(Course, CourseAdmin)
 admin.site.register(AttendanceSession, AttendanceSessionAdmin)
-admin.site.register(AttendanceRecord, AttendanceRecordAdmin) 
\ No newline at end of file
+admin.site.register(AttendanceRecord, AttendanceRecordAdmin)
+admin.site.register(AttendanceSummary, AttendanceSummaryAdmin)
+admin.site.register(CourseNotification, CourseNotificationAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Cache for results computed from course data.
+
+Keys embed the Course.data_version of every course a result was computed
+from. The write paths for sessions, enrollments, attendance records,
+assignments, grades and submissions bump that version, so a cached value is
+never served after its inputs change and entries need no expiry: superseded
+versions are simply never asked for again and get culled by the backend.
+Enrollment changes are caught by an m2m_changed handler on Course.students,
+and enrollments, assignments, submissions and grades also by
+post_save/post_delete handlers, so cascades and QuerySet.delete() are
+covered. Writes that bypass the
+models (QuerySet.update(), bulk_create on the enrollment table, raw SQL)
+must call Course.bump_data_version().
+
+Hits and misses are counted per result name for stats().
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import Course
+
+_MISSING = object()
+_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+
+
+def course_versions(course_ids):
+    """{course_id: data_version} for the given courses, in one query"""
+    return dict(Course.objects.filter(pk__in=set(course_ids)).values_list('pk', 'data_version'))
+
+
+def college_version():
+    """A version that changes whenever any course's data changes"""
+    totals = Course.objects.aggregate(courses=Count('id'), versions=Sum('data_version'))
+    return f'{totals["courses"]}.{totals["versions"] or 0}'
+
+
+def make_key(name, course_ids, *parts):
+    """Cache key for ``name`` at the current data versions of ``course_ids``.
+
+    ``course_ids=None`` keys the result on every course in the college.
+    """
+    if course_ids is None:
+        version = college_version()
+    else:
+        version = ','.join(f'{pk}.{v}' for pk, v in sorted(course_versions(course_ids).items()))
+    digest = hashlib.sha1(f'{version}|{"|".join(map(str, parts))}'.encode()).hexdigest()
+    return f'attendance:{name}:{digest}'
+
+
+def get_or_compute(name, course_ids, compute, *parts):
+    """Return the cached result of ``compute()`` or compute and store it.
+
+    ``parts`` distinguish results of the same name over the same courses,
+    such as the student a dashboard belongs to.
+    """
+    key = make_key(name, course_ids, *parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        with _lock:
+            _hits[name] += 1
+        return value
+    with _lock:
+        _misses[name] += 1
+    value = compute()
+    cache.set(key, value, None)
+    return value
+
+
+def stats():
+    """Hit and miss counts of this process, overall and per result name"""
+    with _lock:
+        names = sorted(set(_hits) | set(_misses))
+        by_name = {
+            name: {'hits': _hits[name], 'misses': _misses[name]}
+            for name in names
+        }
+    hits = sum(entry['hits'] for entry in by_name.values())
+    misses = sum(entry['misses'] for entry in by_name.values())
+    for entry in by_name.values():
+        lookups = entry['hits'] + entry['misses']
+        entry['hit_rate'] = round(entry['hits'] / lookups, 4) if lookups else 0
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0,
+        'by_name': by_name,
+    }
@@ -0,0 +1,285 @@
+"""
+SQLite-backed channel layer for running several Daphne processes on one host.
+
+Messages and group memberships live in a small SQLite database (WAL mode)
+that every process on the machine opens, so group_send from one process
+reaches consumers in all of them without needing Redis.
+
+Each process runs one poller thread. It fetches pending messages for every
+channel that has a waiting receiver in that process with a single
+DELETE ... RETURNING, and hands them to the waiting coroutines. Sends within
+the same process wake the poller immediately; messages from other processes
+are picked up within ``poll_interval`` seconds.
+"""
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger('attendance')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, id);
+CREATE TABLE IF NOT EXISTS group_members (
+    group_name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (group_name, channel)
+);
+'''
+
+# Seconds between sweeps of expired messages and group memberships
+CLEANUP_INTERVAL = 5
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """Channel layer shared between processes through a SQLite database file"""
+
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self,
+        path='channels.sqlite3',
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.01,
+        **kwargs
+    ):
+        super().__init__(
+            expiry=expiry,
+            capacity=capacity,
+            channel_capacity=channel_capacity,
+            **kwargs
+        )
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='channel-layer')
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(deque)
+        self._inbox = defaultdict(deque)
+        self._wakeup = threading.Event()
+        self._poller = None
+        self._pid = None
+
+    # Database access
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _insert(self, channel, payload):
+        connection = self._connection()
+        queued = connection.execute(
+            'SELECT COUNT(*) FROM messages WHERE channel = ? AND expires >= ?',
+            (channel, time.time())
+        ).fetchone()[0]
+        if queued >= self.get_capacity(channel):
+            raise ChannelFull(channel)
+        connection.execute(
+            'INSERT INTO messages (channel, expires, payload) VALUES (?, ?, ?)',
+            (channel, time.time() + self.expiry, payload)
+        )
+
+    def _fan_out(self, group, payload):
+        now = time.time()
+        self._connection().execute(
+            'INSERT INTO messages (channel, expires, payload) '
+            'SELECT channel, ?, ? FROM group_members WHERE group_name = ? AND expires >= ?',
+            (now + self.expiry, payload, group, now)
+        )
+
+    def _fetch(self, connection, channels):
+        placeholders = ', '.join('?' * len(channels))
+        rows = connection.execute(
+            f'DELETE FROM messages WHERE id IN ('
+            f'SELECT id FROM messages WHERE channel IN ({placeholders}) AND expires >= ? '
+            f'ORDER BY id LIMIT 1000'
+            f') RETURNING id, channel, payload',
+            (*channels, time.time())
+        ).fetchall()
+        rows.sort()
+        return rows
+
+    def _cleanup(self, connection):
+        now = time.time()
+        connection.execute('DELETE FROM messages WHERE expires < ?', (now,))
+        connection.execute('DELETE FROM group_members WHERE expires < ?', (now,))
+
+    # Delivery to waiting receivers
+
+    def _ensure_poller(self):
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._poller = threading.Thread(target=self._poll, name='channel-layer-poller', daemon=True)
+                self._poller.start()
+
+    def _poll(self):
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        last_cleanup = 0
+        while True:
+            with self._lock:
+                channels = [channel for channel, waiters in self._waiters.items() if waiters]
+            if not channels:
+                self._wakeup.wait(1)
+                self._wakeup.clear()
+                continue
+
+            try:
+                if time.time() - last_cleanup > CLEANUP_INTERVAL:
+                    self._cleanup(connection)
+                    last_cleanup = time.time()
+                rows = self._fetch(connection, channels)
+            except sqlite3.Error as e:
+                logger.warning(f'Channel layer poll failed: {str(e)}')
+                rows = []
+
+            for _, channel, payload in rows:
+                self._deliver(channel, pickle.loads(payload))
+
+            if not rows:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            waiters = self._waiters.get(channel)
+            while waiters:
+                loop, future = waiters.popleft()
+                if future.done():
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._resolve, channel, future, message)
+                    return
+                except RuntimeError:
+                    # The receiver's event loop has gone away
+                    continue
+            self._inbox[channel].append(message)
+
+    def _resolve(self, channel, future, message):
+        if future.done():
+            # Receiver was cancelled after the message was claimed, keep it
+            with self._lock:
+                self._inbox[channel].appendleft(message)
+        else:
+            future.set_result(message)
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        """Send a message onto a (general or specific) channel"""
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        assert '__asgi_channel__' not in message
+
+        await self._run(self._insert, channel, pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+        self._wakeup.set()
+
+    async def receive(self, channel):
+        """Receive the first message that arrives on the channel"""
+        assert self.valid_channel_name(channel)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            inbox = self._inbox.get(channel)
+            if inbox:
+                message = inbox.popleft()
+                if not inbox:
+                    del self._inbox[channel]
+                return message
+            self._waiters[channel].append((loop, future))
+        self._ensure_poller()
+        self._wakeup.set()
+
+        try:
+            return await future
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(channel)
+                if waiters is not None:
+                    try:
+                        waiters.remove((loop, future))
+                    except ValueError:
+                        pass
+                    if not waiters:
+                        del self._waiters[channel]
+
+    async def new_channel(self, prefix='specific.'):
+        """Return a new channel name for something in this process"""
+        return f'{prefix}.sqlite!{uuid.uuid4().hex}'
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        await self._run(
+            lambda: self._connection().execute(
+                'INSERT OR REPLACE INTO group_members (group_name, channel, expires) VALUES (?, ?, ?)',
+                (group, channel, time.time() + self.group_expiry)
+            )
+        )
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), 'Invalid channel name'
+        assert self.valid_group_name(group), 'Invalid group name'
+        await self._run(
+            lambda: self._connection().execute(
+                'DELETE FROM group_members WHERE group_name = ? AND channel = ?',
+                (group, channel)
+            )
+        )
+
+    async def group_send(self, group, message):
+        """Send a message to every channel in a group with one INSERT ... SELECT"""
+        assert isinstance(message, dict), 'Message is not a dict'
+        assert self.valid_group_name(group), 'Invalid group name'
+        await self._run(self._fan_out, group, pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+        self._wakeup.set()
+
+    # Flush extension
+
+    async def flush(self):
+        def flush():
+            connection = self._connection()
+            connection.execute('DELETE FROM messages')
+            connection.execute('DELETE FROM group_members')
+
+        await self._run(flush)
+        with self._lock:
+            self._inbox.clear()
+
+    async def close(self):
+        pass
@@ -0,0 +1,74 @@
+"""
+Persistence and history for course chat rooms.
+
+Messages are broadcast immediately and stored shortly afterwards by a
+background BatchWriter, so ChatConsumer never waits on a database write.
+"""
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage, Course
+from .tasks import BatchWriter
+
+# Messages sent to a client when it joins a room
+HISTORY_SIZE = 50
+
+
+def room_course_id(room_name):
+    """Course id of a chat room named ``course_<id>``, or None"""
+    prefix, _, course_id = room_name.partition('_')
+    if prefix != 'course' or not course_id.isdigit():
+        return None
+    return int(course_id)
+
+
+def can_join(user, course_id):
+    """Whether a user may read and post in a course's chat room"""
+    if user is None or not user.is_authenticated:
+        return False
+    if user.user_type == 'student':
+        return Course.objects.filter(id=course_id, students__user=user).exists()
+    if user.user_type == 'faculty':
+        return Course.objects.filter(id=course_id, faculty__user=user).exists()
+    return False
+
+
+def serialize(message):
+    return {
+        'id': message.id,
+        'message': message.content,
+        'user_full_name': message.sender.get_full_name(),
+        'user_type': message.sender.user_type,
+        'timestamp': message.created_at.isoformat(),
+    }
+
+
+def history(course_id, before=None, limit=HISTORY_SIZE):
+    """Up to ``limit`` messages older than id ``before``, oldest first"""
+    messages = ChatMessage.objects.filter(course_id=course_id).select_related('sender')
+    if before is not None:
+        messages = messages.filter(id__lt=before)
+    return [serialize(message) for message in reversed(messages.order_by('-id')[:limit])]
+
+
+def _write_messages(items):
+    ChatMessage.objects.bulk_create([
+        ChatMessage(
+            course_id=item['course_id'],
+            sender_id=item['sender_id'],
+            content=item['content'],
+            created_at=parse_datetime(item['timestamp'])
+        ) for item in items
+    ])
+
+
+message_writer = BatchWriter(_write_messages, name='chat-message-writer')
+
+
+def store(course_id, sender_id, content, timestamp):
+    """Queue a message for storage without blocking"""
+    message_writer.add({
+        'course_id': course_id,
+        'sender_id': sender_id,
+        'content': content,
+        'timestamp': timestamp,
+    })
@@ -0,0 +1,119 @@
+"""
+Self check-in for attendance sessions through their QR code (session_uuid).
+
+Check-ins are validated against an in-memory map of active sessions and
+de-duplicated in memory, then written to AttendanceRecord in batches by a
+BatchWriter, so a burst of scans turns into a handful of transactions
+instead of one write per scan. Check-ins still buffered when the process
+exits are written on the way out.
+"""
+import threading
+import time
+
+from .models import AttendanceRecord, AttendanceSession, Course, Student
+from .tasks import BatchWriter
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+NOT_ENROLLED = 'not_enrolled'
+INVALID_SESSION = 'invalid_session'
+
+
+def _write_checkins(items):
+    """Mark (session, student_id) check-ins present, one transaction per session"""
+    by_session = {}
+    for session, student_id in items:
+        by_session.setdefault(session.id, (session, set()))[1].add(student_id)
+    for session, student_ids in by_session.values():
+        AttendanceRecord.bulk_mark(
+            session,
+            {Student(id=student_id): True for student_id in student_ids},
+            marked_by=None
+        )
+
+
+class _ActiveSession:
+    def __init__(self, session, enrolled, present):
+        self.session = session
+        self.enrolled = enrolled
+        self.seen = present
+        self.expires = time.monotonic() + CheckinBuffer.SESSION_TTL
+
+
+class CheckinBuffer:
+    """Thread-safe write-behind buffer for QR check-ins"""
+
+    # How long an active session stays cached before it is re-read, so that
+    # closed sessions and enrollment changes are picked up
+    SESSION_TTL = 30
+
+    def __init__(self, flush_interval=0.5, batch_size=200):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        # Flushes are serialized, so they never compete for the SQLite write
+        # lock; check-ins that can't be written are retried, then dropped
+        self._writer = BatchWriter(
+            _write_checkins, flush_interval=flush_interval, batch_size=batch_size,
+            name='attendance-checkin-flusher'
+        )
+
+    def _load_session(self, session_uuid):
+        session = AttendanceSession.objects.select_related('course').filter(
+            session_uuid=session_uuid,
+            is_active=True
+        ).first()
+        if session is None:
+            return None
+        enrolled = set(Course.students.through.objects.filter(
+            course_id=session.course_id
+        ).values_list('student_id', flat=True))
+        present = set(AttendanceRecord.objects.filter(
+            session=session,
+            status=True
+        ).values_list('student_id', flat=True))
+        return _ActiveSession(session, enrolled, present)
+
+    def _get_session(self, session_uuid):
+        entry = self._sessions.get(session_uuid)
+        if entry is None or entry.expires < time.monotonic():
+            entry = self._load_session(session_uuid)
+            with self._lock:
+                if entry is None:
+                    self._sessions.pop(session_uuid, None)
+                else:
+                    previous = self._sessions.get(session_uuid)
+                    if previous is not None:
+                        entry.seen |= previous.seen
+                    self._sessions[session_uuid] = entry
+        return entry
+
+    def check_in(self, session_uuid, student_id):
+        """Record a scan of a session's QR code by a student.
+
+        Returns one of ACCEPTED, DUPLICATE, NOT_ENROLLED or INVALID_SESSION.
+        Accepted check-ins are written to the database by the next flush.
+        """
+        entry = self._get_session(session_uuid)
+        if entry is None:
+            return INVALID_SESSION
+        if student_id not in entry.enrolled:
+            return NOT_ENROLLED
+
+        with self._lock:
+            if student_id in entry.seen:
+                return DUPLICATE
+            entry.seen.add(student_id)
+        self._writer.add((entry.session, student_id))
+        return ACCEPTED
+
+    def flush(self):
+        """Write all buffered check-ins, returning the number written"""
+        return self._writer.flush()
+
+    @property
+    def pending(self):
+        """Number of accepted check-ins not yet written"""
+        return self._writer.pending
+
+
+checkin_buffer = CheckinBuffer()
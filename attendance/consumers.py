@@ -1,11 +1,24 @@
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.utils import timezone
 
+from . import chat
+from .notifications import notification_groups
+from .live import session_counts, session_group_name
+from .models import AttendanceSession, User
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f'chat_{self.room_name}'
+        self.course_id = chat.room_course_id(self.room_name)
+        self.user = self.scope.get('user')
+
+        # Membership is checked once per connection and trusted afterwards
+        if self.course_id is None or not await database_sync_to_async(chat.can_join)(self.user, self.course_id):
+            await self.close()
+            return
 
         # Join room group
         await self.channel_layer.group_add(
@@ -15,6 +28,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # Replay the most recent messages
+        for message in await database_sync_to_async(chat.history)(self.course_id):
+            await self.send(text_data=json.dumps(message))
+
     async def disconnect(self, close_code):
         # Leave room group
         await self.channel_layer.group_discard(
@@ -25,8 +42,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         message = text_data_json['message']
-        user_full_name = text_data_json['user_full_name']
-        user_type = text_data_json['user_type']
+        timestamp = timezone.now().isoformat()
+
+        # Stored in the background, the broadcast doesn't wait for it
+        chat.store(self.course_id, self.user.id, message, timestamp)
 
         # Send message to room group
         await self.channel_layer.group_send(
@@ -34,9 +53,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'chat_message',
                 'message': message,
-                'user_full_name': user_full_name,
-                'user_type': user_type,
-                'timestamp': timezone.now().isoformat()
+                'user_full_name': self.user.get_full_name(),
+                'user_type': self.user.user_type,
+                'timestamp': timestamp
             }
         )
 
@@ -50,16 +69,72 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
 
 class AttendanceConsumer(AsyncWebsocketConsumer):
+    """Pushes live present/absent/pending counts of one session to its faculty"""
+
     async def connect(self):
+        self.session_id = int(self.scope['url_route']['kwargs']['session_id'])
+        self.group_name = session_group_name(self.session_id)
+
+        if not await self.can_view_session():
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(
+            self.group_name,
+            self.channel_name
+        )
         await self.accept()
 
+        # Send the current counts straight away
+        counts = await database_sync_to_async(session_counts)(self.session_id)
+        await self.send(text_data=json.dumps(counts))
+
     async def disconnect(self, close_code):
-        pass
+        await self.channel_layer.group_discard(
+            self.group_name,
+            self.channel_name
+        )
 
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message = text_data_json['message']
+        # Clients only listen; any message is treated as a refresh request
+        counts = await database_sync_to_async(session_counts)(self.session_id)
+        await self.send(text_data=json.dumps(counts))
 
-        await self.send(text_data=json.dumps({
-            'message': message
-        }))
\ No newline at end of file
+    async def attendance_counts(self, event):
+        await self.send(text_data=json.dumps(event['counts']))
+
+    @database_sync_to_async
+    def can_view_session(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or user.user_type != 'faculty':
+            return False
+        return AttendanceSession.objects.filter(
+            id=self.session_id,
+            course__faculty__user=user
+        ).exists()
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """Pushes new notifications and unread count changes to one user"""
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.groups_joined = await database_sync_to_async(notification_groups)(self.user)
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+        unread_count = await database_sync_to_async(
+            lambda: User.objects.filter(pk=self.user.pk).values_list('unread_notifications', flat=True).first()
+        )()
+        await self.send(text_data=json.dumps({'type': 'unread_count', 'unread_count': unread_count or 0}))
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def notification_event(self, event):
+        await self.send(text_data=json.dumps(event['event']))
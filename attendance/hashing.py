@@ -0,0 +1,52 @@
+"""
+Password hashing for bulk account creation.
+
+make_password is deliberately slow (about a third of a second per password
+with Django's PBKDF2 defaults) and holds the GIL, so creating hundreds of
+accounts hashes on a pool of worker processes instead of one thread. The
+workers are spawned rather than forked, because the web process runs
+threads, and set Django up from the same settings module.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Fewer passwords than this are hashed in-process; starting workers costs more
+POOL_THRESHOLD = 8
+# Passwords handed to a worker at a time
+CHUNK_SIZE = 16
+
+
+def _setup_worker(settings_module):
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None):
+    """Encoded hashes of ``passwords``, in the same order.
+
+    ``workers`` defaults to the PASSWORD_HASH_WORKERS setting, or the number
+    of CPUs.
+    """
+    passwords = list(passwords)
+    workers = workers or getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        return _hash_chunk(passwords)
+
+    chunks = [passwords[start:start + CHUNK_SIZE] for start in range(0, len(passwords), CHUNK_SIZE)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup_worker,
+        initargs=(settings.SETTINGS_MODULE,)
+    ) as pool:
+        return [encoded for hashed in pool.map(_hash_chunk, chunks) for encoded in hashed]
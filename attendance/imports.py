@@ -0,0 +1,320 @@
+"""
+Bulk student import from CSV or XLSX files, run by background jobs.
+
+request_import() stores the upload as a StudentImport and runs it on the
+worker pool. The job reads the file as a stream (openpyxl's read-only mode
+for XLSX), checks every row against key sets loaded with a few queries
+(existing emails, usernames and student IDs, plus duplicates within the
+file), hashes the initial passwords on a process pool and writes users,
+students and enrollments with bulk_create, one transaction per chunk. Rows
+that could not be imported end up in row_errors with the reason, and
+import_error_rows() turns them into a CSV report.
+
+The columns match the add student form: first_name, last_name, email,
+student_id, department and semester. As there, a new student's initial
+password is their student ID, and a row whose email belongs to an existing
+student enrolls that student in the import's course.
+"""
+import csv
+import io
+import logging
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .hashing import hash_passwords
+from .models import Course, Student, StudentImport, User
+from .notifications import recount_unread
+from .tasks import submit
+
+logger = logging.getLogger('attendance')
+
+COLUMNS = ['first_name', 'last_name', 'email', 'student_id', 'department', 'semester']
+EXTENSIONS = ('.csv', '.xlsx')
+# Rows written per transaction
+CHUNK_SIZE = 500
+# Keys per IN (...) lookup while preloading existing accounts
+LOOKUP_SIZE = 500
+
+ERROR_HEADER = ['Row', 'Student ID', 'Email', 'Error']
+
+
+class ImportFileError(Exception):
+    """The file as a whole can't be imported, e.g. a required column is missing"""
+
+
+def is_supported(filename):
+    return os.path.splitext(filename)[1].lower() in EXTENSIONS
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store numeric IDs as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _header(cells):
+    return [_text(cell).lower().replace(' ', '_') for cell in cells]
+
+
+def _csv_rows(file):
+    return csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+
+
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """(row number, {column: text}) for each non-empty row below the header"""
+    rows = _xlsx_rows(file) if filename.lower().endswith('.xlsx') else _csv_rows(file)
+    header = _header(next(rows, []))
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f'Missing columns: {", ".join(missing)}')
+    positions = {column: header.index(column) for column in COLUMNS}
+    for number, cells in enumerate(rows, 2):
+        cells = list(cells)
+        values = {
+            column: _text(cells[position]) if position < len(cells) else ''
+            for column, position in positions.items()
+        }
+        if any(values.values()):
+            yield number, values
+
+
+def _row_error(number, values, message):
+    return {'row': number, 'student_id': values['student_id'], 'email': values['email'], 'error': message}
+
+
+def _check(values):
+    """Normalise a row in place; returns the problem with it, if any"""
+    empty = [column for column in COLUMNS if not values[column]]
+    if empty:
+        return f'Missing {", ".join(empty)}'
+    values['email'] = User.objects.normalize_email(values['email'])
+    try:
+        validate_email(values['email'])
+    except ValidationError:
+        return 'Invalid email'
+    try:
+        values['semester'] = int(values['semester'])
+    except ValueError:
+        return 'Semester must be a number'
+    if not 1 <= values['semester'] <= 8:
+        return 'Semester must be between 1 and 8'
+    if len(values['student_id']) > Student._meta.get_field('student_id').max_length:
+        return 'Student ID is too long'
+    return None
+
+
+def _in_chunks(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), LOOKUP_SIZE):
+        yield keys[start:start + LOOKUP_SIZE]
+
+
+def _existing_accounts(emails, student_ids):
+    """Existing users by email and username, and student IDs in use"""
+    users = {}
+    for chunk in _in_chunks(emails):
+        for user in User.objects.filter(email__in=chunk).select_related('student'):
+            users[user.email] = user
+        for user in User.objects.filter(username__in=chunk).exclude(email__in=chunk).select_related('student'):
+            users[user.username] = user
+    taken_ids = set()
+    for chunk in _in_chunks(student_ids):
+        taken_ids.update(Student.objects.filter(student_id__in=chunk).values_list('student_id', flat=True))
+    return users, taken_ids
+
+
+def _existing_student(user):
+    try:
+        return user.student
+    except Student.DoesNotExist:
+        return None
+
+
+def _create(rows, passwords, course):
+    """Create the users and students of ``rows`` and enroll them; returns the users"""
+    users = User.objects.bulk_create([
+        User(
+            username=values['email'], email=values['email'], password=password,
+            first_name=values['first_name'], last_name=values['last_name'], user_type='student'
+        )
+        for (_, values), password in zip(rows, passwords)
+    ])
+    students = Student.objects.bulk_create([
+        Student(
+            user=user, student_id=values['student_id'], department=values['department'],
+            semester=values['semester']
+        )
+        for user, (_, values) in zip(users, rows)
+    ])
+    if course:
+        Course.students.through.objects.bulk_create([
+            Course.students.through(course_id=course.id, student_id=student.id) for student in students
+        ])
+    return users
+
+
+def import_students(file, filename, course=None):
+    """Import the students in a CSV/XLSX file.
+
+    Returns {'total_rows', 'students_created', 'students_enrolled',
+    'row_errors'}. Raises ImportFileError if the file can't be read at all.
+    """
+    errors = []
+    rows = []
+    seen_emails = {}
+    seen_ids = {}
+    total = 0
+    for number, values in read_rows(file, filename):
+        total += 1
+        problem = _check(values)
+        if not problem and values['email'] in seen_emails:
+            problem = f'Email already appears on row {seen_emails[values["email"]]}'
+        if not problem and values['student_id'] in seen_ids:
+            problem = f'Student ID already appears on row {seen_ids[values["student_id"]]}'
+        if problem:
+            errors.append(_row_error(number, values, problem))
+            continue
+        seen_emails[values['email']] = number
+        seen_ids[values['student_id']] = number
+        rows.append((number, values))
+
+    users, taken_ids = _existing_accounts(seen_emails, seen_ids)
+    enrolled_ids = set()
+    if course:
+        student_ids = [user.student.id for user in users.values() if _existing_student(user)]
+        for chunk in _in_chunks(student_ids):
+            enrolled_ids.update(course.students.filter(id__in=chunk).values_list('id', flat=True))
+
+    new_rows = []
+    existing_students = []
+    for number, values in rows:
+        user = users.get(values['email'])
+        if user is not None:
+            student = _existing_student(user)
+            if student is None:
+                problem = 'Email already belongs to a non-student account'
+            elif not course:
+                problem = 'Student already exists'
+            elif student.id in enrolled_ids:
+                problem = 'Student is already enrolled in this course'
+            else:
+                existing_students.append(student)
+                continue
+            errors.append(_row_error(number, values, problem))
+        elif values['student_id'] in taken_ids:
+            errors.append(_row_error(number, values, 'Student ID already exists'))
+        else:
+            new_rows.append((number, values))
+
+    passwords = hash_passwords(values['student_id'] for _, values in new_rows)
+    created_users = []
+    for start in range(0, len(new_rows), CHUNK_SIZE):
+        chunk = new_rows[start:start + CHUNK_SIZE]
+        chunk_passwords = passwords[start:start + CHUNK_SIZE]
+        try:
+            with transaction.atomic():
+                created_users.extend(_create(chunk, chunk_passwords, course))
+        except IntegrityError:
+            # Someone took an email or student ID since the keys were loaded;
+            # find the rows concerned one at a time
+            for row, password in zip(chunk, chunk_passwords):
+                try:
+                    with transaction.atomic():
+                        created_users.extend(_create([row], [password], course))
+                except IntegrityError:
+                    errors.append(_row_error(*row, 'Email or student ID already exists'))
+
+    if course and existing_students:
+        Course.students.through.objects.bulk_create([
+            Course.students.through(course_id=course.id, student_id=student.id) for student in existing_students
+        ], ignore_conflicts=True)
+    if course and (created_users or existing_students):
+        Course.bump_data_version(course.id)
+        # Course notifications now count towards their unread totals
+        recount_unread(created_users + [student.user for student in existing_students])
+
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'total_rows': total,
+        'students_created': len(created_users),
+        'students_enrolled': len(existing_students),
+        'row_errors': errors,
+    }
+
+
+def request_import(user, course, upload):
+    """Store an uploaded file as a StudentImport and queue it"""
+    job = StudentImport.objects.create(uploaded_by=user, course=course, file=upload, filename=upload.name)
+    transaction.on_commit(lambda: submit(run_import, job.id))
+    return job
+
+
+def run_import(import_id):
+    """Import the file of a queued StudentImport and record the outcome"""
+    # Only one worker gets to move a job out of pending
+    if not StudentImport.objects.filter(id=import_id, status=StudentImport.PENDING).update(
+        status=StudentImport.RUNNING
+    ):
+        return
+    job = StudentImport.objects.select_related('course').get(id=import_id)
+    try:
+        with job.file.open('rb') as file:
+            result = import_students(file, job.filename, job.course)
+        for field, value in result.items():
+            setattr(job, field, value)
+        job.status = StudentImport.DONE
+        logger.info(
+            f'Student import {job.id} finished: {job.students_created} created, '
+            f'{job.students_enrolled} enrolled, {len(job.row_errors)} rows rejected'
+        )
+    except ImportFileError as e:
+        job.status = StudentImport.FAILED
+        job.error = str(e)
+    except Exception as e:
+        job.status = StudentImport.FAILED
+        job.error = str(e)
+        logger.error(f'Student import {job.id} failed: {str(e)}', exc_info=True)
+    # The file holds personal data and is not needed after the run
+    job.file.delete(save=False)
+    job.completed_at = timezone.now()
+    job.save()
+
+
+def import_status(job):
+    """JSON-ready description of an import job"""
+    return {
+        'import_id': job.id,
+        'filename': job.filename,
+        'status': job.status,
+        'total_rows': job.total_rows,
+        'students_created': job.students_created,
+        'students_enrolled': job.students_enrolled,
+        'rejected_rows': len(job.row_errors),
+        'row_errors': job.row_errors,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+    }
+
+
+def import_error_rows(job):
+    """Rows of the CSV error report, under ERROR_HEADER"""
+    for error in job.row_errors:
+        yield [error['row'], error['student_id'], error['email'], error['error']]
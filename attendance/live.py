@@ -0,0 +1,116 @@
+"""
+Live attendance headcounts for open sessions.
+
+Each session has a channel group that faculty dashboards subscribe to. Writes
+to AttendanceRecord call session_changed(); updates are coalesced so a session
+gets at most one broadcast per PUBLISH_INTERVAL however many records change.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import close_old_connections, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger('attendance')
+
+# Minimum seconds between two broadcasts for the same session
+PUBLISH_INTERVAL = 0.5
+
+
+def session_group_name(session_id):
+    return f'attendance_session_{session_id}'
+
+
+def annotate_counts(queryset):
+    """Annotate AttendanceSessions with total, marked and present student counts"""
+    from .models import Course
+
+    enrolled = Course.students.through.objects.filter(
+        course_id=OuterRef('course_id')
+    ).order_by().values('course_id').annotate(count=Count('student_id')).values('count')
+    return queryset.annotate(
+        total_students=Coalesce(Subquery(enrolled, output_field=IntegerField()), Value(0)),
+        marked_count=Count('attendancerecord'),
+        present_count=Count('attendancerecord', filter=Q(attendancerecord__status=True))
+    )
+
+
+def session_counts(session_id):
+    """Current present/absent/pending counts for one session, in one query"""
+    from .models import AttendanceSession
+
+    session = annotate_counts(AttendanceSession.objects.filter(pk=session_id)).first()
+    if session is None:
+        return None
+    return {
+        'session_id': session_id,
+        'total': session.total_students,
+        'present': session.present_count,
+        'absent': session.marked_count - session.present_count,
+        'pending': max(session.total_students - session.marked_count, 0),
+    }
+
+
+class CountPublisher:
+    """Coalesces count updates so each session is broadcast at a bounded rate"""
+
+    def __init__(self, interval=PUBLISH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_sent = {}
+        self._scheduled = set()
+
+    def notify(self, session_id):
+        """Schedule a broadcast of the session's counts"""
+        with self._lock:
+            if session_id in self._scheduled:
+                return
+            self._scheduled.add(session_id)
+            delay = max(0, self._last_sent.get(session_id, 0) + self.interval - time.monotonic())
+        timer = threading.Timer(delay, self._publish, args=[session_id])
+        timer.daemon = True
+        timer.start()
+
+    def _publish(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            # Anything written from here on schedules the next broadcast
+            self._scheduled.discard(session_id)
+            self._last_sent[session_id] = now
+            if len(self._last_sent) > 1000:
+                self._last_sent = {
+                    key: sent for key, sent in self._last_sent.items()
+                    if now - sent < self.interval
+                }
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        close_old_connections()
+        try:
+            counts = session_counts(session_id)
+            if counts is not None:
+                async_to_sync(channel_layer.group_send)(
+                    session_group_name(session_id),
+                    {'type': 'attendance_counts', 'counts': counts}
+                )
+        except Exception as e:
+            logger.error(f'Error publishing counts for session {session_id}: {str(e)}', exc_info=True)
+        finally:
+            close_old_connections()
+
+
+publisher = CountPublisher()
+
+
+def session_changed(*session_ids):
+    """Broadcast new counts for the sessions once the current transaction commits"""
+    def publish():
+        for session_id in session_ids:
+            publisher.notify(session_id)
+
+    transaction.on_commit(publish)
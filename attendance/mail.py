@@ -0,0 +1,159 @@
+"""
+Outgoing email through a durable outbox.
+
+enqueue() stores messages as OutboxEmail rows with a single INSERT and
+returns a job id, whose progress job_status() reports to the user who queued
+it. Workers (``manage.py send_outbox``, and the in-process
+drain kicked off after each enqueue unless MAIL_SEND_IN_PROCESS is False)
+claim pending rows in batches with one atomic UPDATE, so any number of them
+can run side by side without sending a message twice. Each claimed batch is
+sent over one SMTP connection; failed messages go back to pending with an
+exponential backoff until MAIL_MAX_ATTEMPTS is reached. A message that fails
+for any reason only affects itself, never the rest of its batch.
+"""
+import logging
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .tasks import submit
+
+logger = logging.getLogger('attendance')
+
+# Messages claimed, and sent over one SMTP connection, at a time
+BATCH_SIZE = getattr(settings, 'MAIL_BATCH_SIZE', 100)
+# Attempts per message, and the delay before the first retry (doubled each time)
+MAX_ATTEMPTS = getattr(settings, 'MAIL_MAX_ATTEMPTS', 4)
+RETRY_BACKOFF = getattr(settings, 'MAIL_RETRY_BACKOFF', 30)
+# Claims older than this are assumed to belong to a dead worker
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue(messages, queued_by=None):
+    """Store EmailMessages in the outbox and return their job id"""
+    job_id = uuid.uuid4().hex
+    OutboxEmail.objects.bulk_create([
+        OutboxEmail(
+            job_id=job_id,
+            queued_by=queued_by,
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(message.to)
+        ) for message in messages
+    ])
+    if getattr(settings, 'MAIL_SEND_IN_PROCESS', True):
+        transaction.on_commit(lambda: submit(drain))
+    return job_id
+
+
+def job_status(job_id, queued_by=None):
+    """Delivery counts for a job, or None if there is no such job (queued by
+    ``queued_by``, if given)"""
+    rows = OutboxEmail.objects.filter(job_id=job_id)
+    if queued_by is not None:
+        rows = rows.filter(queued_by=queued_by)
+    counts = dict(
+        rows.values('status').annotate(n=Count('id')).values_list('status', 'n')
+    )
+    if not counts:
+        return None
+    total = sum(counts.values())
+    sent = counts.get(OutboxEmail.SENT, 0)
+    failed = counts.get(OutboxEmail.FAILED, 0)
+    if sent + failed < total:
+        status = 'sending'
+    else:
+        status = 'failed' if failed and not sent else 'done'
+    return {
+        'job_id': job_id,
+        'status': status,
+        'total': total,
+        'sent': sent,
+        'failed': failed,
+    }
+
+
+def claim(worker, batch_size=BATCH_SIZE):
+    """Atomically claim up to batch_size sendable rows for one worker"""
+    now = timezone.now()
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    sendable = OutboxEmail.objects.filter(
+        Q(status=OutboxEmail.PENDING, available_at__lte=now) |
+        Q(status=OutboxEmail.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT)
+    )
+    # One UPDATE ... WHERE id IN (SELECT ... LIMIT n): two workers can never
+    # claim the same row
+    OutboxEmail.objects.filter(
+        id__in=sendable.order_by('id').values('id')[:batch_size]
+    ).update(status=OutboxEmail.SENDING, claimed_by=token, claimed_at=now)
+    return list(OutboxEmail.objects.filter(claimed_by=token, status=OutboxEmail.SENDING).order_by('id'))
+
+
+def send_claimed(rows, connection_factory=get_connection):
+    """Send claimed rows over one connection and record the outcome of each.
+
+    Returns (sent, failed) where failed counts rows that will be retried or
+    have run out of attempts.
+    """
+    connection = connection_factory(fail_silently=False)
+    sent_ids = []
+    failures = []
+    try:
+        for row in rows:
+            try:
+                message = EmailMessage(row.subject, row.body, row.from_email, row.to)
+                # The connection stays open between messages once opened
+                connection.open()
+                connection.send_messages([message])
+                sent_ids.append(row.id)
+            except Exception as e:
+                # Anything from a bad address to a broken backend; the
+                # messages already delivered must still be marked sent
+                if not isinstance(e, (smtplib.SMTPException, OSError)):
+                    logger.exception(f'Unexpected error sending email {row.id}')
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                failures.append((row, str(e) or type(e).__name__))
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning('Could not close the SMTP connection', exc_info=True)
+
+    now = timezone.now()
+    OutboxEmail.objects.filter(id__in=sent_ids).update(status=OutboxEmail.SENT, sent_at=now, claimed_by='')
+    for row, error in failures:
+        row.attempts += 1
+        row.last_error = error
+        row.claimed_by = ''
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = OutboxEmail.FAILED
+            logger.error(f'Giving up on email {row.id} to {", ".join(row.to)}: {error}')
+        else:
+            row.status = OutboxEmail.PENDING
+            row.available_at = now + timedelta(seconds=RETRY_BACKOFF * 2 ** (row.attempts - 1))
+            logger.warning(f'Email {row.id} to {", ".join(row.to)} failed ({error}), retrying at {row.available_at}')
+        row.save(update_fields=['attempts', 'last_error', 'claimed_by', 'status', 'available_at'])
+    return len(sent_ids), len(failures)
+
+
+def drain(worker='in-process', batch_size=BATCH_SIZE, connection_factory=get_connection):
+    """Send batches until nothing is sendable; returns (sent, failed)"""
+    total_sent = total_failed = 0
+    while True:
+        rows = claim(worker, batch_size)
+        if not rows:
+            return total_sent, total_failed
+        sent, failed = send_claimed(rows, connection_factory)
+        total_sent += sent
+        total_failed += failed
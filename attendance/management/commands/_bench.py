@@ -0,0 +1,40 @@
+"""Shared helpers for the benchmark management commands"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def temporary_database():
+    """Run the block against a throwaway copy of the schema.
+
+    The test database is file-backed so that background threads (flushers,
+    worker pools) can share it with the main thread.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    fd, path = tempfile.mkstemp(prefix='cms_bench_', suffix='.sqlite3')
+    os.close(fd)
+    test_settings['NAME'] = path
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings['NAME'] = old_test_name
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
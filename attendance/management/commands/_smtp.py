@@ -0,0 +1,78 @@
+"""A minimal local SMTP server for exercising mail dispatch without a relay"""
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost stand-in ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                if server.delay:
+                    time.sleep(server.delay)
+                with server.lock:
+                    server.attempts += 1
+                    reject = server.fail_every and server.attempts % server.fail_every == 0
+                    if not reject:
+                        server.received += 1
+                self.reply('451 Temporary failure' if reject else '250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Accepts and discards mail, counting messages and connections.
+
+    With ``fail_every=n`` every n-th message is rejected with a temporary
+    failure, to exercise retries. ``delay`` adds seconds of latency to each
+    message, like a remote relay would.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_every=0, delay=0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.fail_every = fail_every
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.attempts = 0
+        self.received = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+@contextmanager
+def local_smtp_server(fail_every=0, delay=0):
+    server = LocalSMTPServer(fail_every=fail_every, delay=delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
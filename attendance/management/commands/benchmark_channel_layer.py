@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from attendance.channel_layers import SQLiteChannelLayer
+
+
+def _produce(path, channel, count):
+    """Send count messages to a channel from a separate process"""
+    async def produce():
+        layer = SQLiteChannelLayer(path=path, capacity=count)
+        for i in range(count):
+            await layer.send(channel, {'type': 'bench.message', 'n': i, 'pid': os.getpid()})
+
+    asyncio.run(produce())
+
+
+class Command(BaseCommand):
+    help = 'Compare channel layer throughput of the SQLite layer against the in-memory layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Messages per point-to-point run (default: 2000)')
+        parser.add_argument('--group-size', type=int, default=300, help='Channels in the fan-out group (default: 300)')
+        parser.add_argument('--broadcasts', type=int, default=20, help='group_send calls in the fan-out run (default: 20)')
+        parser.add_argument('--processes', type=int, default=4, help='Producer processes in the cross-process run (default: 4)')
+
+    def handle(self, *args, **options):
+        fd, path = tempfile.mkstemp(prefix='cms_channels_', suffix='.sqlite3')
+        os.close(fd)
+        try:
+            layers = [
+                ('in-memory', lambda: InMemoryChannelLayer(capacity=options['messages'])),
+                ('sqlite', lambda: SQLiteChannelLayer(path=path, capacity=options['messages'])),
+            ]
+            for name, make_layer in layers:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                asyncio.run(self.point_to_point(make_layer(), options['messages']))
+                asyncio.run(self.fan_out(make_layer(), options['group_size'], options['broadcasts']))
+
+            self.stdout.write(self.style.MIGRATE_HEADING('sqlite, cross-process'))
+            asyncio.run(self.cross_process(path, options['processes'], options['messages']))
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f'  {label:<22} {count} msgs in {elapsed:.3f}s ({count / elapsed:,.0f} msgs/s)')
+
+    async def point_to_point(self, layer, count):
+        channel = await layer.new_channel()
+        started = time.perf_counter()
+        for i in range(count):
+            await layer.send(channel, {'type': 'bench.message', 'n': i})
+        sent = time.perf_counter()
+        for _ in range(count):
+            await layer.receive(channel)
+        finished = time.perf_counter()
+        self.report('send', count, sent - started)
+        self.report('receive', count, finished - sent)
+        await layer.flush()
+
+    async def fan_out(self, layer, group_size, broadcasts):
+        group = 'bench_group'
+        channels = [await layer.new_channel() for _ in range(group_size)]
+        for channel in channels:
+            await layer.group_add(group, channel)
+
+        async def consume(channel):
+            for _ in range(broadcasts):
+                await layer.receive(channel)
+
+        started = time.perf_counter()
+        consumers = [asyncio.create_task(consume(channel)) for channel in channels]
+        for i in range(broadcasts):
+            await layer.group_send(group, {'type': 'bench.message', 'n': i})
+        await asyncio.gather(*consumers)
+        self.report(f'group fan-out x{group_size}', group_size * broadcasts, time.perf_counter() - started)
+        await layer.flush()
+
+    async def cross_process(self, path, processes, count):
+        layer = SQLiteChannelLayer(path=path, capacity=count * processes)
+        await layer.flush()
+        channel = 'bench.shared'
+        per_process = count // processes
+
+        started = time.perf_counter()
+        producers = [
+            multiprocessing.Process(target=_produce, args=(path, channel, per_process))
+            for _ in range(processes)
+        ]
+        for producer in producers:
+            producer.start()
+
+        senders = set()
+        for _ in range(per_process * processes):
+            message = await layer.receive(channel)
+            senders.add(message['pid'])
+        elapsed = time.perf_counter() - started
+        for producer in producers:
+            producer.join()
+
+        self.report(f'{processes} producers -> 1', per_process * processes, elapsed)
+        if len(senders) == processes:
+            self.stdout.write(self.style.SUCCESS(f'  Received messages from all {processes} processes'))
+        else:
+            self.stdout.write(self.style.ERROR(f'  Only {len(senders)} of {processes} processes were heard from'))
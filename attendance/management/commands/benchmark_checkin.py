@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance import checkin, views
+from attendance.models import AttendanceRecord, AttendanceSession, Course, Faculty, Student, User
+
+from ._bench import percentile, temporary_database
+
+
+class Command(BaseCommand):
+    help = 'Benchmark QR self check-in throughput against a temporary database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=300, help='Students scanning the code (default: 300)')
+        parser.add_argument('--repeats', type=int, default=2, help='Scans per student, extra scans are duplicates (default: 2)')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent request threads (default: 16)')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            session, users = self.seed(options['students'])
+            self.run(session, users, options['repeats'], options['threads'])
+
+    def seed(self, count):
+        faculty_user = User.objects.create(
+            username='bench-faculty@example.com',
+            email='bench-faculty@example.com',
+            password='!',
+            user_type='faculty'
+        )
+        faculty = Faculty.objects.create(user=faculty_user, faculty_id='BENCHF', department='Benchmark')
+        course = Course.objects.create(course_code='BENCH101', name='Benchmark Course', faculty=faculty)
+
+        User.objects.bulk_create([
+            User(
+                username=f'bench-student-{i}@example.com',
+                email=f'bench-student-{i}@example.com',
+                password='!',
+                user_type='student'
+            ) for i in range(count)
+        ])
+        users = list(User.objects.filter(user_type='student').order_by('id'))
+        Student.objects.bulk_create([
+            Student(user=user, student_id=f'BENCH{i:05d}', department='Benchmark')
+            for i, user in enumerate(users)
+        ])
+        course.students.add(*Student.objects.all())
+
+        now = timezone.now()
+        session = AttendanceSession.objects.create(
+            course=course,
+            date=date.today(),
+            start_time=now.time(),
+            end_time=(now + timedelta(hours=1)).time(),
+            created_by=faculty
+        )
+        # Reload with the student profile attached, as the auth middleware would
+        users = list(User.objects.filter(user_type='student').select_related('student'))
+        return session, users
+
+    def run(self, session, users, repeats, threads):
+        factory = RequestFactory()
+        path = reverse('attendance:self_check_in', args=[session.session_uuid])
+
+        def scan(user):
+            request = factory.post(path)
+            request.user = user
+            started = time.perf_counter()
+            response = views.self_check_in(request, session_uuid=session.session_uuid)
+            close_old_connections()
+            return response.status_code, time.perf_counter() - started
+
+        scans = [user for _ in range(repeats) for user in users]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(scan, scans))
+        accepted_at = time.perf_counter()
+        for _ in range(10):
+            checkin.checkin_buffer.flush()
+            if not checkin.checkin_buffer.pending:
+                break
+        finished = time.perf_counter()
+
+        latencies = [latency * 1000 for _, latency in results]
+        errors = sum(1 for status, _ in results if status != 200)
+        written = AttendanceRecord.objects.filter(session=session, status=True).count()
+
+        self.stdout.write(f'Scans:              {len(scans)} ({len(users)} students x {repeats})')
+        self.stdout.write(f'Errors:             {errors}')
+        self.stdout.write(f'Records written:    {written}')
+        self.stdout.write(f'Accept phase:       {accepted_at - started:.3f}s ({len(scans) / (accepted_at - started):.0f} scans/s)')
+        self.stdout.write(f'Including flush:    {finished - started:.3f}s ({len(scans) / (finished - started):.0f} scans/s)')
+        self.stdout.write(
+            f'Request latency ms: p50={percentile(latencies, 50):.2f} '
+            f'p95={percentile(latencies, 95):.2f} p99={percentile(latencies, 99):.2f}'
+        )
+        if written == len(users) and not errors:
+            self.stdout.write(self.style.SUCCESS('All check-ins recorded'))
+        else:
+            self.stdout.write(self.style.ERROR('Some check-ins were not recorded'))
@@ -0,0 +1,202 @@
+import json
+import os
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceReport, AttendanceSession, Faculty, Student
+from attendance.reports import run_report
+
+from ._bench import percentile
+
+
+def summarize(values):
+    return {
+        'p50': round(percentile(values, 50), 1),
+        'p95': round(percentile(values, 95), 1),
+        'p99': round(percentile(values, 99), 1),
+        'max': round(max(values), 1) if values else 0,
+    }
+
+
+def _consume(response):
+    """Read a response to the end, as the server would; returns its size"""
+    if not response.streaming:
+        return len(response.content)
+    size = 0
+    if response.is_async:
+        async def read():
+            nonlocal size
+            async for chunk in response.streaming_content:
+                size += len(chunk)
+        async_to_sync(read)()
+    else:
+        for chunk in response.streaming_content:
+            size += len(chunk)
+    return size
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the main dashboards, exports and reports against the configured database '
+        '(e.g. after generate_college) as sampled faculty and students, and report p50/p95/p99'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faculty', type=int, default=5, help='Faculty members sampled (default: 5)')
+        parser.add_argument('--students', type=int, default=20, help='Students sampled (default: 20)')
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per page and user (default: 3)')
+        parser.add_argument('--warm', action='store_true', help='Keep the cache between requests instead of clearing it')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for sampling users (default: 1)')
+        parser.add_argument(
+            '--output',
+            default=os.path.join(settings.LOGS_DIR, 'dashboard_benchmark.jsonl'),
+            help='File the results are appended to, one JSON object per page'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        faculty = list(Faculty.objects.filter(course__isnull=False).distinct().select_related('user'))
+        students = list(Student.objects.filter(courses__isnull=False).distinct().select_related('user'))
+        if not faculty or not students:
+            raise CommandError('No faculty or students with courses; run generate_college first')
+        faculty = rng.sample(faculty, min(options['faculty'], len(faculty)))
+        students = rng.sample(students, min(options['students'], len(students)))
+        self.stdout.write(
+            f'{len(faculty)} faculty and {len(students)} students sampled, '
+            f'{"warm" if options["warm"] else "cold"} cache, {options["repeat"]} requests per page and user'
+        )
+
+        timings = {}
+        # Every request and report runs in a transaction that is rolled back,
+        # so the benchmark leaves the data as it found it
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for member in faculty:
+                self.run_pages(member.user, self.faculty_pages(member, rng), options, timings)
+                self.run_reports(member, options, timings)
+            for student in students:
+                self.run_pages(student.user, self.student_pages(), options, timings)
+
+        results = []
+        self.stdout.write(f'{"Page":<36} {"Requests":>8} {"Queries":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+        for label, runs in timings.items():
+            result = {
+                'timestamp': timezone.now().isoformat(),
+                'page': label,
+                'requests': len(runs['ms']),
+                'warm': options['warm'],
+                'statuses': sorted(set(runs['statuses'])),
+                'queries': max(runs['queries']),
+                'bytes': max(runs['bytes']),
+                'ms': summarize(runs['ms']),
+            }
+            results.append(result)
+            stats = result['ms']
+            failed = '' if result['statuses'] == [200] else f'  status {result["statuses"]}'
+            self.stdout.write(
+                f'{label:<36} {result["requests"]:>8} {result["queries"]:>8} {stats["p50"]:>9.1f} '
+                f'{stats["p95"]:>9.1f} {stats["p99"]:>9.1f} {stats["max"]:>9.1f}{failed}'
+            )
+
+        os.makedirs(os.path.dirname(options['output']) or '.', exist_ok=True)
+        with open(options['output'], 'a') as output:
+            for result in results:
+                output.write(json.dumps(result) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
+
+    def faculty_pages(self, member, rng):
+        """(label, url) of the pages a faculty member uses most"""
+        course = rng.choice(list(member.course_set.all()))
+        student = rng.choice(list(course.students.all()) or [None])
+        session = AttendanceSession.objects.filter(course=course).order_by('-date').first()
+        pages = [
+            ('faculty_dashboard', reverse('attendance:faculty_dashboard')),
+            ('view_all_students', reverse('attendance:view_all_students')),
+            ('course_students', reverse('attendance:course_students', args=[course.id])),
+            ('view_recent_activities', reverse('attendance:view_recent_activities')),
+            ('notifications (faculty)', reverse('attendance:notifications')),
+            ('export_attendance (all courses)', reverse('attendance:export_attendance')),
+        ]
+        if student:
+            pages.append(('student_attendance', reverse('attendance:student_attendance', args=[student.id])))
+        if session:
+            pages.append(('mark_attendance', reverse('attendance:mark_attendance', kwargs={'session_id': session.id})))
+            pages.append((
+                'export_attendance (session)',
+                reverse('attendance:export_attendance', kwargs={'session_id': session.id})
+            ))
+        return pages
+
+    def student_pages(self):
+        return [
+            ('student_dashboard', reverse('attendance:student_dashboard')),
+            ('view_attendance', reverse('attendance:view_attendance')),
+            ('view_assignments', reverse('attendance:view_assignments')),
+            ('notifications (student)', reverse('attendance:notifications')),
+        ]
+
+    def record(self, timings, label, status, queries, size, ms):
+        runs = timings.setdefault(label, {'statuses': [], 'queries': [], 'bytes': [], 'ms': []})
+        runs['statuses'].append(status)
+        runs['queries'].append(queries)
+        runs['bytes'].append(size)
+        runs['ms'].append(ms)
+
+    def run_pages(self, user, pages, options, timings):
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        try:
+            for label, url in pages:
+                for _ in range(options['repeat']):
+                    with transaction.atomic():
+                        if not options['warm']:
+                            cache.clear()
+                        reset_queries()
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            response = client.get(url)
+                            size = _consume(response)
+                            elapsed = (time.perf_counter() - started) * 1000
+                        response.close()
+                        transaction.set_rollback(True)
+                    self.record(timings, label, response.status_code, len(queries), size, elapsed)
+        finally:
+            client.logout()
+
+    def run_reports(self, member, options, timings):
+        """Time the report worker on a course attendance and a grades report"""
+        course = member.course_set.first()
+        end_date = timezone.localdate()
+        for report_type in ('course', 'grades'):
+            label = f'report ({report_type})'
+            for _ in range(options['repeat']):
+                with transaction.atomic():
+                    if not options['warm']:
+                        cache.clear()
+                    report = AttendanceReport.objects.create(
+                        title=f'Benchmark {report_type} report for {course.course_code}', report_type=report_type,
+                        generated_by=member.user, course=course,
+                        start_date=end_date - timedelta(weeks=26), end_date=end_date
+                    )
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        run_report(report.id)
+                        elapsed = (time.perf_counter() - started) * 1000
+                    report.refresh_from_db()
+                    size = report.report_file.size if report.report_file else 0
+                    status = 200 if report.status == AttendanceReport.DONE else 500
+                    if report.report_file:
+                        report.report_file.delete(save=False)
+                    transaction.set_rollback(True)
+                self.record(timings, label, status, len(queries), size, elapsed)
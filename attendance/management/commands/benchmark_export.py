@@ -0,0 +1,143 @@
+import asyncio
+import io
+import multiprocessing
+import time
+from datetime import date, time as clock, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+
+from attendance.models import AttendanceRecord, AttendanceSession, Course, Faculty, Student, User
+from attendance.views import export_attendance
+
+from ._bench import temporary_database
+
+STUDENTS_PER_COURSE = 200
+
+
+def _rss_kib(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def _export(faculty_user_id, legacy):
+    """Run one export in a forked worker; returns (peak RSS growth KiB, seconds, bytes)"""
+    user = User.objects.get(id=faculty_user_id)
+    # Reset the RSS high-water mark (VmHWM) so only this export counts
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    baseline = _rss_kib('VmRSS')
+    started = time.perf_counter()
+    if legacy:
+        size = _legacy_export(user.faculty)
+    else:
+        request = RequestFactory().get('/faculty/attendance/export/')
+        request.user = user
+        response = export_attendance(request)
+
+        async def consume():
+            total = 0
+            async for chunk in response.streaming_content:
+                total += len(chunk)
+            return total
+        size = asyncio.run(consume())
+    return _rss_kib('VmHWM') - baseline, time.perf_counter() - started, size
+
+
+def _legacy_export(faculty):
+    """The previous export: a full openpyxl workbook built in memory"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook()
+    ws = wb.active
+    headers = ['Course', 'Date', 'Student ID', 'Name', 'Status', 'Marked By', 'Marked At']
+    for col, header in enumerate(headers, 1):
+        ws.cell(row=1, column=col, value=header)
+    records = AttendanceRecord.objects.filter(session__course__faculty=faculty).select_related(
+        'session', 'session__course', 'student', 'student__user', 'marked_by', 'marked_by__user'
+    ).order_by('session__course__course_code', '-session__date')
+    for row, record in enumerate(records, 2):
+        ws.cell(row=row, column=1, value=record.session.course.course_code)
+        ws.cell(row=row, column=2, value=record.session.date.strftime('%d-%m-%Y'))
+        ws.cell(row=row, column=3, value=record.student.student_id)
+        ws.cell(row=row, column=4, value=record.student.user.get_full_name())
+        ws.cell(row=row, column=5, value='Present' if record.status else 'Absent')
+        ws.cell(row=row, column=6, value=record.marked_by.user.get_full_name() if record.marked_by else 'System')
+        ws.cell(row=row, column=7, value=record.marked_at.strftime('%d-%m-%Y %I:%M %p') if record.marked_at else 'N/A')
+    for column in ws.columns:
+        ws.column_dimensions[get_column_letter(column[0].column)].width = max(len(str(c.value)) for c in column) + 2
+    output = io.BytesIO()
+    wb.save(output)
+    return output.tell()
+
+
+class Command(BaseCommand):
+    help = 'Measure peak memory of the attendance XLSX export against the number of rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='10000,50000,200000', help='Comma separated row counts (default: 10000,50000,200000)')
+        parser.add_argument('--legacy-max', type=int, default=50000,
+                            help='Also time the previous in-memory openpyxl export up to this many rows (default: 50000)')
+
+    def handle(self, *args, **options):
+        row_counts = [int(n) for n in options['rows'].split(',')]
+
+        with temporary_database():
+            faculties = {rows: self.seed(run, rows) for run, rows in enumerate(row_counts, 1)}
+            # Each export runs in a forked worker with its own connection
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Rows       Export     Peak RSS growth   Time      Size'))
+            for rows, faculty_user_id in faculties.items():
+                modes = [('streaming', False)]
+                if rows <= options['legacy_max']:
+                    modes.append(('openpyxl', True))
+                for label, legacy in modes:
+                    with context.Pool(1) as pool:
+                        growth, elapsed, size = pool.apply(_export, (faculty_user_id, legacy))
+                    self.stdout.write(
+                        f'{rows:<10,} {label:<10} {growth / 1024:>10.1f} MiB {elapsed:>8.2f}s {size / 1024 / 1024:>7.1f} MiB'
+                    )
+
+    def seed(self, run, rows):
+        """A faculty with one course holding ``rows`` attendance records; returns the faculty's user id"""
+        user = User.objects.create(username=f'bench-faculty-{run}', email=f'bench-faculty-{run}@example.com', user_type='faculty', first_name='Bench', last_name=f'Faculty {run}')
+        faculty = Faculty.objects.create(user=user, faculty_id=f'BF{run}', department='Benchmark')
+        course = Course.objects.create(course_code=f'BENCH{run}', name=f'Export benchmark {run}', faculty=faculty)
+
+        student_count = min(STUDENTS_PER_COURSE, rows)
+        users = User.objects.bulk_create([
+            User(username=f'bench-{run}-{i}', email=f'bench-{run}-{i}@example.com', user_type='student', first_name=f'Student {i}', last_name=f'Run {run}')
+            for i in range(student_count)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=u, student_id=f'B{run}{i:05d}', department='Benchmark') for i, u in enumerate(users)
+        ])
+        course.students.add(*students)
+
+        session_count = -(-rows // student_count)
+        sessions = AttendanceSession.objects.bulk_create([
+            AttendanceSession(course=course, date=date(2020, 1, 1) + timedelta(days=i), start_time=clock(9), end_time=clock(10), created_by=faculty)
+            for i in range(session_count)
+        ])
+        records = (
+            AttendanceRecord(session=session, student=student, status=(i + j) % 5 != 0, marked_by=faculty if j % 2 else None)
+            for i, session in enumerate(sessions)
+            for j, student in enumerate(students)
+        )
+        batch = []
+        for n, record in enumerate(records):
+            if n == rows:
+                break
+            batch.append(record)
+            if len(batch) == 5000:
+                AttendanceRecord.objects.bulk_create(batch)
+                batch = []
+        AttendanceRecord.objects.bulk_create(batch)
+        return user.id
@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+
+from django.core.mail import EmailMessage, send_mail
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+
+from attendance import mail
+from attendance.models import OutboxEmail
+
+from ._bench import temporary_database
+from ._smtp import local_smtp_server
+
+
+class Command(BaseCommand):
+    help = 'Compare per-message send_mail with outbox workers against a local SMTP stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='Emails to send (default: 500)')
+        parser.add_argument('--workers', default='1,2,4', help='Comma separated outbox worker process counts (default: 1,2,4)')
+        parser.add_argument('--batch-size', type=int, default=25, help='Emails claimed per batch (default: 25)')
+        parser.add_argument('--smtp-latency', type=float, default=5, help='Milliseconds the stand-in takes per message (default: 5)')
+        parser.add_argument('--fail-every', type=int, default=0, help='Reject every n-th message to exercise retries')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        # Retry rejected messages straight away instead of minutes later
+        mail.RETRY_BACKOFF = 0
+
+        with temporary_database(), local_smtp_server(options['fail_every'], options['smtp_latency'] / 1000) as server:
+            smtp = {
+                'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                'EMAIL_HOST': '127.0.0.1',
+                'EMAIL_PORT': server.port,
+                'EMAIL_USE_TLS': False,
+                'EMAIL_USE_SSL': False,
+                'EMAIL_HOST_USER': '',
+                'EMAIL_HOST_PASSWORD': '',
+                'MAIL_SEND_IN_PROCESS': False,
+            }
+            with override_settings(**smtp):
+                self.stdout.write(self.style.MIGRATE_HEADING('send_mail per message'))
+                started = time.perf_counter()
+                failures = 0
+                for i in range(count):
+                    try:
+                        send_mail('Benchmark', 'Body', 'noreply@example.com', [f'student{i}@example.com'])
+                    except Exception:
+                        failures += 1
+                self.report(server, count - failures, failures, time.perf_counter() - started)
+
+                for workers in [int(n) for n in options['workers'].split(',')]:
+                    self.stdout.write(self.style.MIGRATE_HEADING(
+                        f'Outbox, {workers} worker process(es), batches of {options["batch_size"]}'
+                    ))
+                    server.connections = server.received = 0
+                    OutboxEmail.objects.all().delete()
+
+                    started = time.perf_counter()
+                    mail.enqueue([
+                        EmailMessage('Benchmark', 'Body', 'noreply@example.com', [f'student{i}@example.com'])
+                        for i in range(count)
+                    ])
+                    enqueued = time.perf_counter() - started
+
+                    # Forked workers open their own connections to the same database
+                    connections.close_all()
+                    context = multiprocessing.get_context('fork')
+                    with context.Pool(workers) as pool:
+                        results = pool.starmap(mail.drain, [(f'bench-{n}', options['batch_size']) for n in range(workers)])
+                    elapsed = time.perf_counter() - started
+
+                    self.stdout.write(f'  Enqueue:          {enqueued * 1000:.1f}ms for {count} emails')
+                    self.report(server, sum(sent for sent, _ in results), sum(failed for _, failed in results), elapsed)
+
+    def report(self, server, sent, failed, elapsed):
+        self.stdout.write(f'  Sent:             {sent} ({failed} failed attempts)')
+        self.stdout.write(f'  Received:         {server.received}')
+        self.stdout.write(f'  SMTP connections: {server.connections}')
+        self.stdout.write(f'  Throughput:       {sent / elapsed:,.0f} msgs/s ({elapsed:.3f}s)')
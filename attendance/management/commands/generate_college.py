@@ -0,0 +1,355 @@
+import json
+import random
+import time
+from datetime import datetime, time as clock, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from attendance.models import (
+    ActivityEvent, Assignment, AssignmentSubmission, AttendanceRecord, AttendanceSession, AttendanceSummary,
+    Course, Faculty, Grade, Notification, Student, User
+)
+
+# Usernames, emails and codes of generated objects start with this
+PREFIX = 'synthetic'
+# Rows per INSERT batch
+BATCH_SIZE = 5000
+
+DEPARTMENTS = [
+    'Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Economics', 'History', 'English',
+    'Mechanical Engineering', 'Electrical Engineering', 'Philosophy', 'Psychology',
+]
+GRADE_BANDS = [(90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (50, 'C+'), (40, 'C'), (33, 'D'), (0, 'F')]
+NOTIFICATION_TYPES = [kind for kind, _ in Notification.NOTIFICATION_TYPES]
+
+
+def _batches(objects, size=BATCH_SIZE):
+    """Lists of up to ``size`` items from any iterable"""
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(model, fields, rows):
+    """INSERT value tuples with executemany; returns the row count.
+
+    For the largest tables: skipping model instances is several times faster
+    than bulk_create. Values must already be in their database form, and
+    auto_now_add fields take the given value.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+    sql = f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * len(fields))})'
+    count = 0
+    with connection.cursor() as cursor:
+        for batch in _batches(rows):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def _db_datetime(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _letter(percentage):
+    return next(letter for floor, letter in GRADE_BANDS if percentage >= floor)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic college in the configured database: departments, faculty, courses, '
+        'enrollments, a semester of attendance sessions and records, assignments, submissions, '
+        'grades and notifications. Everything is written with bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=6, help='Departments (default: 6)')
+        parser.add_argument('--faculty', type=int, default=8, help='Faculty members per department (default: 8)')
+        parser.add_argument('--courses', type=int, default=2, help='Courses taught by each faculty member (default: 2)')
+        parser.add_argument('--students', type=int, default=4000, help='Students (default: 4000)')
+        parser.add_argument('--enrollments', type=int, default=5, help='Courses per student (default: 5)')
+        parser.add_argument('--weeks', type=int, default=16, help='Weeks of the semester, ending today (default: 16)')
+        parser.add_argument('--sessions-per-week', type=int, default=3, help='Sessions of each course per week (default: 3)')
+        parser.add_argument('--assignments', type=int, default=4, help='Assignments per course (default: 4)')
+        parser.add_argument('--notifications', type=int, default=10, help='Notifications per student (default: 10)')
+        parser.add_argument('--attendance-rate', type=float, default=0.85, help='Average share of sessions attended (default: 0.85)')
+        parser.add_argument('--submission-rate', type=float, default=0.8, help='Share of assignments submitted (default: 0.8)')
+        parser.add_argument('--password', default='password', help='Password of every generated user (default: password)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, for reproducible colleges (default: 1)')
+        parser.add_argument('--clear', action='store_true', help='Delete a previously generated college first')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['departments'] <= len(DEPARTMENTS):
+            raise CommandError(f'--departments must be between 1 and {len(DEPARTMENTS)}')
+        if not 1 <= options['sessions_per_week'] <= 5:
+            raise CommandError('--sessions-per-week must be between 1 and 5')
+
+        generated = User.objects.filter(username__startswith=f'{PREFIX}-')
+        if options['clear']:
+            started = time.perf_counter()
+            # Courses first, so their sessions and records go in a few large deletes
+            Course.objects.filter(course_code__startswith=PREFIX.upper()).delete()
+            generated.delete()
+            self.stdout.write(f'Removed the previous synthetic college in {time.perf_counter() - started:.1f}s')
+        elif generated.exists():
+            raise CommandError('A synthetic college already exists; pass --clear to replace it')
+
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.counts = {}
+        started = time.perf_counter()
+        # DEBUG would keep the SQL of every batch in connection.queries
+        with override_settings(DEBUG=False), transaction.atomic():
+            self.generate()
+        elapsed = time.perf_counter() - started
+
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(f'Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)'))
+        self.stdout.write(f'Log in as {PREFIX}-faculty-1@example.edu or {PREFIX}-student-1@example.edu '
+                          f'with password "{options["password"]}"')
+
+    def step(self, label, count, started):
+        self.counts[label] = count
+        self.stdout.write(f'{label:<22} {count:>10,} {time.perf_counter() - started:>7.1f}s')
+
+    def generate(self):
+        options = self.options
+        rng = self.rng
+        password = make_password(options['password'])
+        departments = DEPARTMENTS[:options['departments']]
+
+        # People. Notification read flags are drawn up front so each user is
+        # created with its unread counter already right.
+        started = time.perf_counter()
+        student_count = options['students']
+        read_flags = [
+            [rng.random() < 0.4 for _ in range(options['notifications'])]
+            for _ in range(student_count)
+        ]
+        faculty_users = [
+            User(
+                username=f'{PREFIX}-faculty-{n}', email=f'{PREFIX}-faculty-{n}@example.edu', password=password,
+                user_type='faculty', first_name=f'Faculty{n}', last_name=department.split()[0]
+            )
+            for n, department in enumerate(
+                (department for department in departments for _ in range(options['faculty'])), 1
+            )
+        ]
+        student_users = [
+            User(
+                username=f'{PREFIX}-student-{n}', email=f'{PREFIX}-student-{n}@example.edu', password=password,
+                user_type='student', first_name=f'Student{n}', last_name=f'Family{n % 97}',
+                unread_notifications=flags.count(False)
+            )
+            for n, flags in enumerate(read_flags, 1)
+        ]
+        for batch in _batches(faculty_users + student_users):
+            User.objects.bulk_create(batch)
+        self.step('Users', len(faculty_users) + len(student_users), started)
+
+        started = time.perf_counter()
+        faculty = Faculty.objects.bulk_create([
+            Faculty(user=user, faculty_id=f'{PREFIX.upper()}F{n:04d}', department=user_department)
+            for n, (user, user_department) in enumerate(
+                zip(faculty_users, (department for department in departments for _ in range(options['faculty']))), 1
+            )
+        ])
+        students = []
+        for batch in _batches(
+            Student(
+                user=user, student_id=f'{PREFIX.upper()}{n:06d}', department=rng.choice(departments),
+                semester=rng.randint(1, 8), roll_number=str(n)
+            )
+            for n, user in enumerate(student_users, 1)
+        ):
+            students.extend(Student.objects.bulk_create(batch))
+        self.step('Faculty and students', len(faculty) + len(students), started)
+
+        # Courses, each with a fixed weekly timetable
+        started = time.perf_counter()
+        courses = Course.objects.bulk_create([
+            Course(
+                course_code=f'{PREFIX.upper()}{n:04d}', name=f'{member.department} {100 + n}',
+                description=f'Synthetic {member.department} course', faculty=member
+            )
+            for n, member in enumerate((member for member in faculty for _ in range(options['courses'])), 1)
+        ])
+        timetable = {
+            course.id: (sorted(rng.sample(range(5), options['sessions_per_week'])), clock(8 + n % 9))
+            for n, course in enumerate(courses)
+        }
+        by_department = {}
+        for course in courses:
+            by_department.setdefault(course.faculty.department, []).append(course)
+        self.step('Courses', len(courses), started)
+
+        # Enrollments: mostly courses of the student's own department
+        started = time.perf_counter()
+        roster = {course.id: [] for course in courses}
+        enrollment_count = min(options['enrollments'], len(courses))
+        for student in students:
+            own = by_department[student.department]
+            chosen = set(rng.sample(own, min(len(own), (enrollment_count + 1) // 2)))
+            while len(chosen) < enrollment_count:
+                chosen.add(rng.choice(courses))
+            for course in chosen:
+                roster[course.id].append(student)
+        Through = Course.students.through
+        enrollments = (
+            Through(course_id=course_id, student_id=student.id)
+            for course_id, members in roster.items() for student in members
+        )
+        for batch in _batches(enrollments):
+            Through.objects.bulk_create(batch)
+        self.step('Enrollments', sum(len(members) for members in roster.values()), started)
+
+        # A semester of past sessions
+        started = time.perf_counter()
+        today = timezone.localdate()
+        first_monday = today - timedelta(days=today.weekday(), weeks=options['weeks'] - 1)
+        sessions = []
+        for course in courses:
+            weekdays, start_time = timetable[course.id]
+            for week in range(options['weeks']):
+                for weekday in weekdays:
+                    day = first_monday + timedelta(weeks=week, days=weekday)
+                    if day >= today:
+                        continue
+                    sessions.append(AttendanceSession(
+                        course=course, date=day, start_time=start_time,
+                        end_time=clock(start_time.hour + 1), created_by=course.faculty, is_active=False
+                    ))
+        for batch in _batches(sessions):
+            AttendanceSession.objects.bulk_create(batch)
+        self.step('Sessions', len(sessions), started)
+
+        # Attendance records, with each student's own attendance habit, and
+        # the activity events the write paths would have recorded for them
+        started = time.perf_counter()
+        rate = options['attendance_rate']
+        habit = {student.id: min(1.0, max(0.0, rng.gauss(rate, 0.1))) for student in students}
+        tallies = {}
+        events = []
+
+        def records():
+            for session in sessions:
+                marked_at = datetime.combine(session.date, session.start_time, tzinfo=dt_timezone.utc)
+                db_marked_at = _db_datetime(marked_at)
+                session_date = str(session.date)
+                for student in roster[session.course_id]:
+                    status = rng.random() < habit[student.id]
+                    tally = tallies.setdefault((student.id, session.course_id), [0, 0, marked_at])
+                    tally[0] += 1
+                    tally[1] += status
+                    tally[2] = max(tally[2], marked_at)
+                    events.append((
+                        session.course_id, ActivityEvent.ATTENDANCE, student.id,
+                        json.dumps({'status': status, 'session_id': session.id, 'session_date': session_date}),
+                        db_marked_at
+                    ))
+                    yield session.id, student.id, status, session.created_by_id, db_marked_at
+
+        record_count = _insert(
+            AttendanceRecord, ['session', 'student', 'status', 'marked_by', 'marked_at'], records()
+        )
+        self.step('Attendance records', record_count, started)
+
+        started = time.perf_counter()
+        summaries = (
+            AttendanceSummary(
+                student_id=student_id, course_id=course_id, total=total, present=present,
+                last_marked=last_marked
+            )
+            for (student_id, course_id), (total, present, last_marked) in tallies.items()
+        )
+        for batch in _batches(summaries):
+            AttendanceSummary.objects.bulk_create(batch)
+        self.step('Attendance summaries', len(tallies), started)
+
+        # Assignments spread over the semester; the past ones are mostly graded
+        started = time.perf_counter()
+        now = timezone.now()
+        semester_start = datetime.combine(first_monday, clock(23, 59), tzinfo=dt_timezone.utc)
+        assignments = Assignment.objects.bulk_create([
+            Assignment(
+                course=course, title=f'Assignment {n}', description='Synthetic assignment', max_marks=100,
+                due_date=semester_start + timedelta(weeks=options['weeks'] * n / (options['assignments'] + 1)),
+                created_by=course.faculty
+            )
+            for course in courses for n in range(1, options['assignments'] + 1)
+        ])
+        self.step('Assignments', len(assignments), started)
+
+        started = time.perf_counter()
+
+        def submissions():
+            for assignment in assignments:
+                past_due = assignment.due_date < now
+                submitted_at = _db_datetime(assignment.due_date - timedelta(days=1))
+                graded_at = _db_datetime(assignment.due_date + timedelta(days=3))
+                for student in roster[assignment.course_id]:
+                    if rng.random() >= options['submission_rate']:
+                        continue
+                    graded = past_due and rng.random() < 0.8
+                    events.append((
+                        assignment.course_id, ActivityEvent.SUBMISSION, student.id,
+                        json.dumps({'assignment_id': assignment.id, 'assignment_title': assignment.title}),
+                        submitted_at
+                    ))
+                    yield (
+                        assignment.id, student.id, submitted_at,
+                        rng.randint(35, 100) if graded else None,
+                        'Synthetic feedback' if graded else None,
+                        assignment.created_by_id if graded else None,
+                        graded_at if graded else None
+                    )
+
+        submission_count = _insert(
+            AssignmentSubmission,
+            ['assignment', 'student', 'submitted_at', 'marks', 'feedback', 'graded_by', 'graded_at'],
+            submissions()
+        )
+        self.step('Submissions', submission_count, started)
+
+        started = time.perf_counter()
+        grades = []
+        for course_id, members in roster.items():
+            for student in members:
+                percentage = min(100.0, max(0.0, rng.gauss(70, 12)))
+                grades.append(Grade(
+                    student=student, course_id=course_id, grade=_letter(percentage),
+                    percentage=Decimal(f'{percentage:.2f}')
+                ))
+        for batch in _batches(grades):
+            Grade.objects.bulk_create(batch)
+        self.step('Grades', len(grades), started)
+
+        started = time.perf_counter()
+        semester_days = (today - first_monday).days or 1
+        semester_begins = datetime.combine(first_monday, clock(8), tzinfo=dt_timezone.utc)
+        notifications = (
+            (
+                student.user_id, f'Update {n + 1}', 'Synthetic notification', rng.choice(NOTIFICATION_TYPES), read,
+                _db_datetime(semester_begins + timedelta(days=semester_days * (n + rng.random()) / len(flags)))
+            )
+            for student, flags in zip(students, read_flags) for n, read in enumerate(flags)
+        )
+        notification_count = _insert(
+            Notification, ['user', 'title', 'message', 'notification_type', 'read', 'created_at'], notifications
+        )
+        self.step('Notifications', notification_count, started)
+
+        started = time.perf_counter()
+        event_count = _insert(ActivityEvent, ['course', 'event_type', 'student', 'data', 'created_at'], events)
+        self.step('Activity events', event_count, started)
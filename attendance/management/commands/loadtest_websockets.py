@@ -0,0 +1,234 @@
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from attendance.live import session_group_name
+from attendance.models import AttendanceSession, Course, Faculty, Student, User
+
+from ._bench import percentile, temporary_database
+
+# Seconds a client waits for a frame before the run is considered failed
+RECEIVE_TIMEOUT = 30
+
+LAYERS = {
+    'memory': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    'sqlite': {'BACKEND': 'attendance.channel_layers.SQLiteChannelLayer'},
+}
+
+
+def summarize(values):
+    return {
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'max': round(max(values), 3) if values else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Load test the WebSocket consumers through the ASGI application with simulated clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', default='50,300,1000', help='Comma separated room sizes (default: 50,300,1000)')
+        parser.add_argument('--consumer', choices=['chat', 'attendance', 'both'], default='both')
+        parser.add_argument('--layer', choices=sorted(LAYERS), default='sqlite', help='Channel layer to run against (default: sqlite)')
+        parser.add_argument('--broadcasts', type=int, default=5, help='Broadcasts timed per room (default: 5)')
+        parser.add_argument('--concurrency', type=int, default=100, help='Clients connecting at the same time (default: 100)')
+        parser.add_argument(
+            '--output',
+            default=os.path.join(settings.LOGS_DIR, 'websocket_loadtest.jsonl'),
+            help='File the results are appended to, one JSON object per room'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['rooms'].split(',')]
+        consumers = ['chat', 'attendance'] if options['consumer'] == 'both' else [options['consumer']]
+
+        layer = dict(LAYERS[options['layer']])
+        layer_path = None
+        if options['layer'] == 'sqlite':
+            fd, layer_path = tempfile.mkstemp(prefix='cms_channels_', suffix='.sqlite3')
+            os.close(fd)
+            layer['CONFIG'] = {'path': layer_path, 'capacity': 1000}
+
+        try:
+            with temporary_database(), override_settings(CHANNEL_LAYERS={'default': layer}):
+                # Imported here so the consumers pick up the overridden layer
+                from college_management.asgi import application
+
+                results = []
+                for consumer in consumers:
+                    for size in sizes:
+                        path, headers, group = self.seed(consumer, size)
+                        self.stdout.write(self.style.MIGRATE_HEADING(f'{consumer}, {size} members'))
+                        result = asyncio.run(self.run_room(application, consumer, path, headers, group, options))
+                        result['layer'] = options['layer']
+                        self.report(result)
+                        results.append(result)
+        finally:
+            if layer_path:
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(layer_path + suffix):
+                        os.remove(layer_path + suffix)
+
+        os.makedirs(os.path.dirname(options['output']) or '.', exist_ok=True)
+        with open(options['output'], 'a') as output:
+            for result in results:
+                output.write(json.dumps(result) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Results appended to {options["output"]}'))
+
+    def seed(self, consumer, size):
+        """Create a room with ``size`` members.
+
+        Returns the WebSocket path, one set of session cookie headers per member
+        and, for attendance rooms, the group counts are broadcast to.
+        """
+        run = Course.objects.count() + 1
+        faculty_user = User.objects.create(
+            username=f'load-faculty-{run}@example.com',
+            email=f'load-faculty-{run}@example.com',
+            password='!',
+            user_type='faculty'
+        )
+        faculty = Faculty.objects.create(user=faculty_user, faculty_id=f'LOADF{run}', department='Load test')
+        course = Course.objects.create(course_code=f'LOAD{run}', name='Load test course', faculty=faculty)
+
+        if consumer == 'attendance':
+            # Every connection is a faculty dashboard watching the same session
+            now = timezone.now()
+            session = AttendanceSession.objects.create(
+                course=course,
+                date=date.today(),
+                start_time=now.time(),
+                end_time=(now + timedelta(hours=1)).time(),
+                created_by=faculty
+            )
+            path = f'/ws/attendance/session/{session.id}/'
+            group = session_group_name(session.id)
+            users = [faculty_user] * size
+        else:
+            User.objects.bulk_create([
+                User(
+                    username=f'load-student-{run}-{i}@example.com',
+                    email=f'load-student-{run}-{i}@example.com',
+                    password='!',
+                    user_type='student'
+                ) for i in range(size)
+            ])
+            users = list(User.objects.filter(username__startswith=f'load-student-{run}-'))
+            Student.objects.bulk_create([
+                Student(user=user, student_id=f'L{run}-{i}', department='Load test')
+                for i, user in enumerate(users)
+            ])
+            course.students.add(*Student.objects.filter(user__in=users))
+            path = f'/ws/chat/course_{course.id}/'
+            group = None
+
+        headers = [[(b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.login(user)}'.encode())] for user in users]
+        return path, headers, group
+
+    def login(self, user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    async def connect_all(self, application, path, headers, concurrency):
+        """Open one client per header set; returns (clients, connect latencies in ms)"""
+        limit = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def connect(client_headers):
+            client = WebsocketCommunicator(application, path, headers=client_headers)
+            async with limit:
+                started = time.perf_counter()
+                connected, _ = await client.connect(timeout=RECEIVE_TIMEOUT)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if not connected:
+                raise RuntimeError(f'Connection to {path} was rejected')
+            return client
+
+        clients = await asyncio.gather(*(connect(client_headers) for client_headers in headers))
+        return clients, latencies
+
+    async def drain(self, clients):
+        """Discard frames sent on connect (chat history, initial counts)"""
+        for client in clients:
+            while not await client.receive_nothing(timeout=0.01):
+                await client.receive_from()
+
+    async def run_room(self, application, consumer, path, headers, group, options):
+        clients, connect_latencies = await self.connect_all(application, path, headers, options['concurrency'])
+        await self.drain(clients)
+
+        fanout_latencies = []
+        broadcast_totals = []
+        for i in range(options['broadcasts']):
+            started = time.perf_counter()
+            if consumer == 'chat':
+                await clients[0].send_json_to({'message': f'load test {i}'})
+            else:
+                await get_channel_layer().group_send(
+                    group,
+                    {'type': 'attendance_counts', 'counts': {'broadcast': i}}
+                )
+
+            async def receive(client):
+                await client.receive_from(timeout=RECEIVE_TIMEOUT)
+                fanout_latencies.append((time.perf_counter() - started) * 1000)
+
+            await asyncio.gather(*(receive(client) for client in clients))
+            broadcast_totals.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(client.disconnect() for client in clients))
+        del clients
+
+        # Memory is measured on a second connect pass, tracing would skew the timings
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        clients, _ = await self.connect_all(application, path, headers, options['concurrency'])
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        await asyncio.gather(*(client.disconnect() for client in clients))
+
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'consumer': consumer,
+            'members': len(headers),
+            'broadcasts': options['broadcasts'],
+            'connect_ms': summarize(connect_latencies),
+            'fanout_ms': summarize(fanout_latencies),
+            'broadcast_complete_ms': summarize(broadcast_totals),
+            'memory_per_connection_kb': round(used / len(headers) / 1024, 1),
+        }
+
+    def report(self, result):
+        for label, key in [
+            ('Connect latency ms', 'connect_ms'),
+            ('Fan-out latency ms', 'fanout_ms'),
+            ('Broadcast done ms', 'broadcast_complete_ms'),
+        ]:
+            stats = result[key]
+            self.stdout.write(
+                f'  {label:<20} p50={stats["p50"]:.2f} p95={stats["p95"]:.2f} '
+                f'p99={stats["p99"]:.2f} max={stats["max"]:.2f}'
+            )
+        self.stdout.write(f'  {"Memory/connection":<20} {result["memory_per_connection_kb"]:.1f} KiB')
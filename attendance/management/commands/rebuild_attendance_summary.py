@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from attendance.models import AttendanceRecord, AttendanceSummary, Student
+
+
+class Command(BaseCommand):
+    help = 'Rebuild and verify the AttendanceSummary table from AttendanceRecord, in chunks of students'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of students to process per transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report mismatches, do not write anything'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        verify_only = options['verify']
+
+        student_ids = list(Student.objects.order_by('id').values_list('id', flat=True))
+        checked = mismatched = 0
+
+        for start in range(0, len(student_ids), chunk_size):
+            chunk = student_ids[start:start + chunk_size]
+            with transaction.atomic():
+                expected = {
+                    (row['student_id'], row['session__course_id']): row
+                    for row in AttendanceRecord.objects.filter(
+                        student_id__in=chunk
+                    ).values('student_id', 'session__course_id').annotate(
+                        total=Count('id'),
+                        present=Count('id', filter=Q(status=True)),
+                        last_marked=Max('marked_at')
+                    ).order_by()
+                }
+                current = {
+                    (summary.student_id, summary.course_id): summary
+                    for summary in AttendanceSummary.objects.filter(student_id__in=chunk)
+                }
+
+                stale = [key for key in current if key not in expected]
+                changed = []
+                for key, row in expected.items():
+                    summary = current.get(key)
+                    if summary and summary.total == row['total'] and summary.present == row['present']:
+                        continue
+                    changed.append(AttendanceSummary(
+                        student_id=key[0],
+                        course_id=key[1],
+                        total=row['total'],
+                        present=row['present'],
+                        last_marked=row['last_marked']
+                    ))
+
+                checked += len(expected)
+                mismatched += len(stale) + len(changed)
+
+                if verify_only:
+                    for summary in changed:
+                        self.stdout.write(
+                            f'Mismatch for student {summary.student_id}, course {summary.course_id}: '
+                            f'expected {summary.present}/{summary.total}'
+                        )
+                    for student_id, course_id in stale:
+                        self.stdout.write(f'Stale summary for student {student_id}, course {course_id}')
+                    continue
+
+                if stale:
+                    AttendanceSummary.objects.filter(
+                        pk__in=[current[key].pk for key in stale]
+                    ).delete()
+                AttendanceSummary.objects.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=['student', 'course'],
+                    update_fields=['total', 'present', 'last_marked']
+                )
+
+            self.stdout.write(f'Processed {min(start + chunk_size, len(student_ids))}/{len(student_ids)} students')
+
+        if verify_only:
+            if mismatched:
+                raise CommandError(f'Checked {checked} summaries, {mismatched} mismatched')
+            self.stdout.write(self.style.SUCCESS(f'Checked {checked} summaries, all up to date'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Checked {checked} summaries, repaired {mismatched}'))
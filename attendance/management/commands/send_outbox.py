@@ -0,0 +1,32 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance import mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails; run several workers to send faster'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=mail.BATCH_SIZE, help=f'Emails claimed per batch (default: {mail.BATCH_SIZE})')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the outbox is empty (default: 1)')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is empty')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}-{os.getpid()}'
+        self.stdout.write(f'Mail worker {worker} started')
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = mail.drain(worker, options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Mail worker stopped')
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+BATCH_SIZE = 1000
+
+
+def backfill_summaries(apps, schema_editor):
+    """Summarise the attendance recorded before the table existed"""
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceSummary = apps.get_model('attendance', 'AttendanceSummary')
+    rows = AttendanceRecord.objects.values('student_id', 'session__course_id').annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(status=True)),
+        last_marked=Max('marked_at')
+    ).order_by()
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(AttendanceSummary(
+            student_id=row['student_id'],
+            course_id=row['session__course_id'],
+            total=row['total'],
+            present=row['present'],
+            last_marked=row['last_marked']
+        ))
+        if len(batch) == BATCH_SIZE:
+            AttendanceSummary.objects.bulk_create(batch)
+            batch = []
+    AttendanceSummary.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_remove_course_attendance_policy_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('last_marked', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='attendance.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='attendance.student')),
+            ],
+            options={
+                'verbose_name_plural': 'attendance summaries',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_chatmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('attendance', 'Attendance'), ('grade', 'Grade'), ('assignment', 'Assignment'), ('resource', 'Resource'), ('notice', 'Notice')], max_length=20)),
+                ('related_id', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_notifications', to='attendance.course')),
+                ('session', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='absence_notification', to='attendance.attendancesession')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseNotificationRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reads', to='attendance.coursenotification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='coursenotification',
+            index=models.Index(fields=['course', '-created_at'], name='attendance__course__6a686f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coursenotificationread',
+            unique_together={('notification', 'user')},
+        ),
+    ]
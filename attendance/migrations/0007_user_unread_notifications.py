@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:58
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_unread(apps, schema_editor):
+    User = apps.get_model('attendance', 'User')
+    Notification = apps.get_model('attendance', 'Notification')
+    CourseNotification = apps.get_model('attendance', 'CourseNotification')
+    CourseNotificationRead = apps.get_model('attendance', 'CourseNotificationRead')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    Student = apps.get_model('attendance', 'Student')
+    Enrollment = apps.get_model('attendance', 'Course').students.through
+
+    counts = dict(
+        Notification.objects.filter(read=False).values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+    )
+    if CourseNotification.objects.exists():
+        read = set(CourseNotificationRead.objects.values_list('notification_id', 'user_id'))
+        for student_id, user_id in Student.objects.values_list('id', 'user_id'):
+            enrolled = Enrollment.objects.filter(student_id=student_id).values('course_id')
+            absent = AttendanceRecord.objects.filter(student_id=student_id, status=False).values('session_id')
+            visible = CourseNotification.objects.filter(
+                Q(session__isnull=True, course_id__in=enrolled) | Q(session_id__in=absent)
+            ).values_list('id', flat=True)
+            unread = sum(1 for notification_id in visible if (notification_id, user_id) not in read)
+            if unread:
+                counts[user_id] = counts.get(user_id, 0) + unread
+
+    for user_id, count in counts.items():
+        User.objects.filter(id=user_id).update(unread_notifications=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_coursenotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancereport',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancereport',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='attendancereport',
+            name='params_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='attendancereport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='attendancereport',
+            name='report_type',
+            field=models.CharField(choices=[('student', 'Individual Student'), ('course', 'Course Report'), ('department', 'Department Report'), ('custom', 'Custom Report'), ('grades', 'Course Grades'), ('performance', 'Overall Performance')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_attendancereport_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_events(apps, schema_editor):
+    ActivityEvent = apps.get_model('attendance', 'ActivityEvent')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AssignmentSubmission = apps.get_model('attendance', 'AssignmentSubmission')
+
+    def events():
+        records = AttendanceRecord.objects.order_by('marked_at', 'id').values_list(
+            'session__course_id', 'student_id', 'status', 'session_id', 'session__date', 'marked_at'
+        )
+        for course_id, student_id, status, session_id, session_date, marked_at in records.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                course_id=course_id,
+                event_type='attendance',
+                student_id=student_id,
+                # Older databases store the status as '1'/'0' text
+                data={
+                    'status': status not in (None, False, 0, '0', '', 'False'),
+                    'session_id': session_id,
+                    'session_date': str(session_date),
+                },
+                created_at=marked_at
+            )
+        submissions = AssignmentSubmission.objects.order_by('submitted_at', 'id').values_list(
+            'assignment__course_id', 'student_id', 'assignment_id', 'assignment__title', 'submitted_at'
+        )
+        for course_id, student_id, assignment_id, title, submitted_at in submissions.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                course_id=course_id,
+                event_type='submission',
+                student_id=student_id,
+                data={'assignment_id': assignment_id, 'assignment_title': title},
+                created_at=submitted_at
+            )
+
+    batch = []
+    for event in events():
+        batch.append(event)
+        if len(batch) == BATCH_SIZE:
+            ActivityEvent.objects.bulk_create(batch)
+            batch = []
+    ActivityEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_course_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('attendance', 'Attendance Marked'), ('submission', 'Assignment Submission')], max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to='attendance.course')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='attendance.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'created_at', 'id'], name='attendance__course__05c579_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# FTS5 indexes of each student's registration number, name and email (see
+# attendance.search). Triggers keep them in step with attendance_student and
+# attendance_user, including bulk inserts and raw SQL.
+TABLES = {
+    'attendance_student_search': "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'",
+    'attendance_student_trigram': "tokenize = 'trigram'",
+}
+
+ROWS = """
+    SELECT s.id, s.student_id, trim(u.first_name || ' ' || u.last_name), u.email
+    FROM attendance_student s JOIN attendance_user u ON u.id = s.user_id
+"""
+
+
+def statements(table, options):
+    insert = f'INSERT INTO {table} (rowid, student_id, name, email) {ROWS}'
+    return [
+        f'CREATE VIRTUAL TABLE {table} USING fts5(student_id, name, email, {options})',
+        insert,
+        f"""CREATE TRIGGER {table}_student_insert AFTER INSERT ON attendance_student BEGIN
+            {insert} WHERE s.id = new.id;
+        END""",
+        f"""CREATE TRIGGER {table}_student_update AFTER UPDATE OF student_id, user_id ON attendance_student BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+            {insert} WHERE s.id = new.id;
+        END""",
+        f"""CREATE TRIGGER {table}_student_delete AFTER DELETE ON attendance_student BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER {table}_user_update AFTER UPDATE OF first_name, last_name, email ON attendance_user BEGIN
+            DELETE FROM {table} WHERE rowid IN (SELECT id FROM attendance_student WHERE user_id = new.id);
+            {insert} WHERE s.user_id = new.id;
+        END""",
+    ]
+
+
+def create_search_tables(apps, schema_editor):
+    # FTS5 is SQLite only; elsewhere attendance.search falls back to icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, options in TABLES.items():
+        for sql in statements(table, options):
+            schema_editor.execute(sql)
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        for trigger in ('student_insert', 'student_update', 'student_delete', 'user_update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0012_hot_table_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backdate_enrollments(apps, schema_editor):
+    """Existing enrollments keep seeing every notice of their course"""
+    Course = apps.get_model('attendance', 'Course')
+    Enrollment = apps.get_model('attendance', 'Enrollment')
+    Enrollment.objects.update(
+        enrolled_at=Subquery(Course.objects.filter(pk=OuterRef('course_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0015_outboxemail_queued_by'),
+    ]
+
+    operations = [
+        # The table Django created for Course.students becomes the Enrollment model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Enrollment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='attendance.course')),
+                        ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='attendance.student')),
+                    ],
+                    options={
+                        'db_table': 'attendance_course_students',
+                        'unique_together': {('course', 'student')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='course',
+                    name='students',
+                    field=models.ManyToManyField(blank=True, related_name='courses', through='attendance.Enrollment', to='attendance.student'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='enrolled_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backdate_enrollments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:16
+
+import os
+
+import attendance.models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+
+PRIVATE_FILES = [
+    ('AttendanceReport', 'report_file', attendance.models.report_file_path),
+    ('StudentImport', 'file', attendance.models.student_import_path),
+]
+
+
+def move_to_private_storage(apps, schema_editor):
+    """Files written so far sit under MEDIA_ROOT, which is served to anyone"""
+    public = FileSystemStorage(location=settings.MEDIA_ROOT)
+    private = attendance.models.private_storage()
+    for model_name, field_name, upload_to in PRIVATE_FILES:
+        model = apps.get_model('attendance', model_name)
+        for pk, name in model.objects.exclude(**{field_name: ''}).values_list('pk', field_name):
+            if not name or not public.exists(name):
+                continue
+            with public.open(name) as source:
+                new_name = private.save(upload_to(None, os.path.basename(name)), source)
+            public.delete(name)
+            model.objects.filter(pk=pk).update(**{field_name: new_name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_enrollment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancereport',
+            name='report_file',
+            field=models.FileField(blank=True, null=True, storage=attendance.models.private_storage, upload_to=attendance.models.report_file_path),
+        ),
+        migrations.AlterField(
+            model_name='studentimport',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=attendance.models.private_storage, upload_to=attendance.models.student_import_path),
+        ),
+        migrations.RunPython(move_to_private_storage, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,18 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, Round, RowNumber
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
 from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.conf import settings
 from django.utils import timezone
-# import qrcode
-# from io import BytesIO
-# from django.core.files import File
-# from PIL import Image
 import uuid
 import os
 
+from .live import session_changed
+
 def validate_image_file(value):
     ext = os.path.splitext(value.name)[1]
     valid_extensions = ['.jpg', '.jpeg', '.png', '.gif']
@@ -18,6 +21,24 @@ def validate_image_file(value):
     if value.size > 5*1024*1024:  # 5MB limit
         raise ValidationError('File size too large. Size should not exceed 5MB.')
 
+# Outside MEDIA_ROOT, which is served to anyone; these files are only
+# handed out by views that check permissions
+_private_storage = FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+def private_storage():
+    return _private_storage
+
+def report_file_path(instance, filename):
+    # A random directory makes the path unguessable; downloads keep the name
+    return f'attendance_reports/{uuid.uuid4().hex}/{filename}'
+
+def student_import_path(instance, filename):
+    return f'student_imports/{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}'
+
+def _as_bool(value):
+    # Older databases store AttendanceRecord.status as '1'/'0' text
+    return value not in (None, False, 0, '0', '', 'False')
+
 class User(AbstractUser):
     USER_TYPES = (
         ('student', 'Student'),
@@ -35,7 +56,9 @@ class User(AbstractUser):
     )
     password_reset_token = models.CharField(max_length=100, null=True, blank=True)
     password_reset_token_created = models.DateTimeField(null=True, blank=True)
-    
+    # Maintained by attendance.notifications, so the badge needs no COUNT query
+    unread_notifications = models.PositiveIntegerField(default=0)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     
@@ -45,6 +68,36 @@ class User(AbstractUser):
     def get_user_type_display(self):
         return dict(self.USER_TYPES).get(self.user_type, '')
 
+class StudentQuerySet(models.QuerySet):
+    def enrolled_in(self, courses):
+        """Students enrolled in any of ``courses`` (a Course queryset or ids)"""
+        enrollments = Course.students.through.objects.filter(student=OuterRef('pk'), course__in=courses)
+        return self.filter(Exists(enrollments))
+
+    def with_roster_stats(self, courses):
+        """Annotate attendance and submission totals over ``courses``.
+
+        Adds attendance_total, attendance_present, attendance_percentage
+        (rounded to one decimal) and pending_submissions (submissions not
+        marked yet), each as a correlated subquery, so a roster of any size
+        is read with a single query.
+        """
+        summaries = AttendanceSummary.objects.filter(student=OuterRef('pk'), course__in=courses).values('student')
+        pending = AssignmentSubmission.objects.filter(
+            student=OuterRef('pk'), assignment__course__in=courses, marks__isnull=True
+        ).values('student')
+        return self.select_related('user').annotate(
+            attendance_total=Coalesce(Subquery(summaries.annotate(n=Sum('total')).values('n')), 0),
+            attendance_present=Coalesce(Subquery(summaries.annotate(n=Sum('present')).values('n')), 0),
+            pending_submissions=Coalesce(Subquery(pending.annotate(n=Count('id')).values('n')), 0),
+        ).annotate(
+            attendance_percentage=Case(
+                When(attendance_total__gt=0, then=Round(F('attendance_present') * 100.0 / F('attendance_total'), 1)),
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     student_id = models.CharField(max_length=20, unique=True)
@@ -53,18 +106,16 @@ class Student(models.Model):
     qr_code = models.FileField(upload_to='qr_codes/', blank=True, null=True)
     roll_number = models.CharField(max_length=20, blank=True, default='')
 
+    objects = StudentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.student_id} - {self.user.get_full_name()}"
 
     def get_attendance_percentage(self):
-        total_sessions = AttendanceSession.objects.filter(course__in=self.courses.all()).count()
-        if total_sessions == 0:
+        totals = self.attendance_summaries.aggregate(total=Sum('total'), present=Sum('present'))
+        if not totals['total']:
             return 0
-        present_sessions = AttendanceRecord.objects.filter(
-            student=self,
-            status=True
-        ).count()
-        return (present_sessions / total_sessions) * 100
+        return (totals['present'] / totals['total']) * 100
 
 class Faculty(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -105,15 +156,27 @@ class Course(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE)
-    students = models.ManyToManyField('Student', related_name='courses', blank=True)
+    students = models.ManyToManyField('Student', through='Enrollment', related_name='courses', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every write to the course's sessions, enrollments, attendance
+    # records, assignments, grades and submissions; cached results are keyed by it
+    data_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.course_code} - {self.name}"
     
+    @classmethod
+    def bump_data_version(cls, *course_ids):
+        """Invalidate cached results computed from these courses' data"""
+        cls.objects.filter(pk__in=set(course_ids)).update(data_version=F('data_version') + 1)
+    
     def get_attendance_stats(self):
         """Get attendance statistics for this course"""
+        from .cache import get_or_compute
+        return get_or_compute('course_attendance_stats', [self.pk], self._compute_attendance_stats)
+    
+    def _compute_attendance_stats(self):
         total_students = self.students.count()
         total_sessions = AttendanceSession.objects.filter(course=self).count()
         
@@ -125,20 +188,19 @@ class Course(models.Model):
                 'total_sessions': total_sessions
             }
         
-        # Calculate average attendance
-        attendance_sum = 0
-        below_threshold_count = 0
+        # Calculate average attendance from the per-student summaries
         threshold = 75  # Default threshold
+        summaries = AttendanceSummary.objects.filter(course=self, student__courses=self)
         
-        if self.attendance_policy:
-            threshold = self.attendance_policy.min_attendance_percentage
-        
-        for student in self.students.all():
-            percentage = student.get_attendance_percentage()
+        attendance_sum = 0
+        # Enrolled students without any marked sessions count as 0%
+        below_threshold_count = total_students
+        for summary in summaries:
+            percentage = summary.percentage
             attendance_sum += percentage
             
-            if percentage < threshold:
-                below_threshold_count += 1
+            if percentage >= threshold:
+                below_threshold_count -= 1
         
         return {
             'average_attendance': attendance_sum / total_students,
@@ -147,6 +209,25 @@ class Course(models.Model):
             'total_sessions': total_sessions
         }
 
+class Enrollment(models.Model):
+    """A student's enrollment in a course (the Course.students table).
+    
+    Course-wide notifications are shown to a student from enrolled_at on.
+    Course.students.add/remove/set bump the course's data version through
+    _enrollment_changed; saving or deleting single enrollments (the admin
+    inline, a deleted student) through _course_data_saved/_deleted.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
+    enrolled_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'attendance_course_students'
+        unique_together = ('course', 'student')
+    
+    def __str__(self):
+        return f"{self.student} in {self.course.course_code}"
+
 class AttendanceSession(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     date = models.DateField()
@@ -177,25 +258,13 @@ class AttendanceSession(models.Model):
         return f"{self.course.course_code} - {self.date} ({self.start_time} to {self.end_time})"
     
     def save(self, *args, **kwargs):
-        # QR code generation disabled temporarily
-        # if not self.qr_code:
-        #     qr = qrcode.QRCode(
-        #         version=1,
-        #         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        #         box_size=10,
-        #         border=4,
-        #     )
-        #     qr.add_data(str(self.session_uuid))
-        #     qr.make(fit=True)
-        #     
-        #     img = qr.make_image(fill_color="black", back_color="white")
-        #     buffer = BytesIO()
-        #     img.save(buffer, format="PNG")
-        #     
-        #     filename = f'session_qr_{self.session_uuid}.png'
-        #     self.qr_code.save(filename, File(buffer), save=False)
-        
         super().save(*args, **kwargs)
+        Course.bump_data_version(self.course_id)
+        
+        # Render the QR code in the background once the session is committed
+        if not self.qr_code:
+            from .qr import enqueue_session_qr
+            transaction.on_commit(lambda: enqueue_session_qr(self))
     
     def get_attendance_count(self):
         """Get count of present and absent students"""
@@ -215,25 +284,82 @@ class AttendanceSession(models.Model):
     def close_session(self):
         """Close the session and mark absent for students who haven't been marked"""
         if self.is_active:
-            # Get all students who haven't been marked
-            marked_students = AttendanceRecord.objects.filter(
-                session=self
-            ).values_list('student_id', flat=True)
+            AttendanceSession.close_sessions(AttendanceSession.objects.filter(pk=self.pk))
+            self.is_active = False
+    
+    @classmethod
+    def close_sessions(cls, queryset):
+        """Close many sessions at once, back-filling absences for unmarked students.
+        
+        Runs a fixed number of queries regardless of how many sessions or
+        students are involved. Returns the number of absences recorded.
+        """
+        with transaction.atomic():
+            sessions = list(queryset.filter(is_active=True).select_related('course'))
+            if not sessions:
+                return 0
             
-            unmarked_students = self.course.students.exclude(id__in=marked_students)
+            # Enrolled students per course and students already marked per session
+            enrollments = {}
+            for course_id, student_id, user_id in Course.students.through.objects.filter(
+                course_id__in={session.course_id for session in sessions}
+            ).values_list('course_id', 'student_id', 'student__user_id'):
+                enrollments.setdefault(course_id, []).append(Student(id=student_id, user_id=user_id))
             
-            # Mark them as absent
-            for student in unmarked_students:
-                AttendanceRecord.objects.create(
-                    session=self,
-                    student=student,
-                    status=False,
-                    marked_by=self.created_by,
-                    marked_at=timezone.now()
-                )
+            marked = set(AttendanceRecord.objects.filter(
+                session__in=sessions
+            ).values_list('session_id', 'student_id'))
             
-            self.is_active = False
-            self.save()
+            now = timezone.now()
+            records = []
+            for session in sessions:
+                for student in enrollments.get(session.course_id, []):
+                    if (session.id, student.id) in marked:
+                        continue
+                    records.append(AttendanceRecord(
+                        session=session,
+                        student=student,
+                        status=False,
+                        marked_by_id=session.created_by_id,
+                        marked_at=now
+                    ))
+            
+            AttendanceRecord.objects.bulk_create(records)
+            AttendanceRecord.absence_notifications({record.session for record in records})
+            
+            from .activity import attendance_marked
+            attendance_marked(records, when=now)
+            
+            from .notifications import absence_audience_changed
+            deltas = {}
+            absent = {}
+            for record in records:
+                key = (record.student_id, record.session.course_id)
+                deltas[key] = (deltas.get(key, (0, 0))[0] + 1, 0)
+                absent.setdefault(record.session, []).append(record.student_id)
+            AttendanceSummary.apply_deltas(deltas)
+            for session, student_ids in absent.items():
+                absence_audience_changed(session, absent_student_ids=student_ids)
+            cls.objects.filter(pk__in=[session.pk for session in sessions]).update(is_active=False)
+            Course.bump_data_version(*[session.course_id for session in sessions])
+            session_changed(*[session.pk for session in sessions])
+        
+        return len(records)
+
+class AttendanceRecordQuerySet(models.QuerySet):
+    def latest_per_course_date(self):
+        """Only the most recently marked record per student, course and date.
+
+        Ranks the records with ROW_NUMBER() over their (student, course,
+        date) partition, so the whole selection is one query.
+        """
+        return self.annotate(
+            recency=Window(
+                RowNumber(),
+                partition_by=[F('student_id'), F('session__course_id'), F('session__date')],
+                order_by=[F('marked_at').desc(), F('id').desc()]
+            )
+        ).filter(recency=1)
 
 class AttendanceRecord(models.Model):
     session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE)
@@ -241,34 +367,197 @@ class AttendanceRecord(models.Model):
     status = models.BooleanField(default=False)  # True for present, False for absent
     marked_by = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True)
     marked_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AttendanceRecordQuerySet.as_manager()
     
     def save(self, *args, **kwargs):
-        # Get the course from the session
-        course = self.session.course
+        adding = self._state.adding
+        previous = False
+        if not adding:
+            previous = _as_bool(
+                AttendanceRecord.objects.filter(pk=self.pk).values_list('status', flat=True).first()
+            )
         
         # Save the record first
         super().save(*args, **kwargs)
         
+        AttendanceSummary.apply_deltas({
+            (self.student_id, self.session.course_id): (int(adding), int(self.status) - int(previous))
+        })
+        Course.bump_data_version(self.session.course_id)
+        session_changed(self.session_id)
+        if adding or _as_bool(self.status) != previous:
+            from .activity import attendance_marked
+            attendance_marked([self])
+        
         # Send notification if student is absent
-        if not self.status:  # If student is absent
+        was_absent = not adding and not previous
+        if was_absent != (not self.status):
             try:
-                # Create notification for student
-                Notification.objects.create(
-                    user=self.student.user,
-                    title=f'Absence Notification - {course.name}',
-                    message=f'You were marked absent for {course.name} on {self.session.date}',
-                    notification_type='attendance'
-                )
+                # Students see it through the session's absence notification
+                from .notifications import absence_audience_changed
+                if not self.status:
+                    self.absence_notifications([self.session])
+                    absence_audience_changed(self.session, absent_student_ids=[self.student_id])
+                else:
+                    absence_audience_changed(self.session, present_student_ids=[self.student_id])
             except Exception as e:
                 # Log the error but don't prevent saving
                 print(f"Error creating notification: {str(e)}")
     
+    @staticmethod
+    def absence_notifications(sessions):
+        """Create the absence notification of each session unless it exists.
+        
+        One notification per session is shown to every student marked absent
+        in it, so this is a single INSERT however many students are absent.
+        """
+        CourseNotification.objects.bulk_create([
+            CourseNotification(
+                course=session.course,
+                session=session,
+                title=f'Absence Notification - {session.course.name}',
+                message=f'You were marked absent for {session.course.name} on {session.date}',
+                notification_type='attendance'
+            ) for session in sessions
+        ], ignore_conflicts=True)
+    
+    @classmethod
+    def bulk_mark(cls, session, statuses, marked_by):
+        """Mark attendance for many students of a session at once.
+        
+        ``statuses`` maps Student instances to True (present) or False (absent).
+        Records are upserted and the absence notification created in a single
+        transaction, giving the same result as saving each record in turn.
+        Returns a dict with the number of records created and updated.
+        """
+        with transaction.atomic():
+            existing = dict(
+                cls.objects.filter(session=session).values_list('student_id', 'status')
+            )
+            records = [
+                cls(session=session, student=student, status=status, marked_by=marked_by)
+                for student, status in statuses.items()
+            ]
+            cls.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['session', 'student'],
+                update_fields=['status', 'marked_by'],
+            )
+            if not all(statuses.values()):
+                cls.absence_notifications([session])
+            
+            from .notifications import absence_audience_changed
+            absence_audience_changed(
+                session,
+                absent_student_ids=[
+                    student.id for student, status in statuses.items()
+                    if not status and (student.id not in existing or _as_bool(existing[student.id]))
+                ],
+                present_student_ids=[
+                    student.id for student, status in statuses.items()
+                    if status and student.id in existing and not _as_bool(existing[student.id])
+                ]
+            )
+            AttendanceSummary.apply_deltas({
+                (student.id, session.course_id): (
+                    0 if student.id in existing else 1,
+                    int(status) - int(_as_bool(existing.get(student.id, False)))
+                )
+                for student, status in statuses.items()
+            })
+            Course.bump_data_version(session.course_id)
+            session_changed(session.id)
+            
+            from .activity import attendance_marked
+            attendance_marked([
+                record for record in records
+                if record.student_id not in existing or record.status != _as_bool(existing[record.student_id])
+            ])
+        
+        updated = sum(1 for student in statuses if student.id in existing)
+        return {
+            'created': len(records) - updated,
+            'updated': updated,
+        }
+    
     class Meta:
         unique_together = ('session', 'student')
-        
+        indexes = [
+            models.Index(fields=['student', 'status']),
+            models.Index(fields=['session', 'status']),
+        ]
+    
     def __str__(self):
         return f"{self.student} - {self.session} - {'Present' if self.status else 'Absent'}"
 
+class AttendanceSummary(models.Model):
+    """Running attendance totals per student and course.
+    
+    Kept up to date incrementally by every AttendanceRecord write path so that
+    attendance percentages can be read without counting records. Deleting
+    records, directly or through a session, is subtracted by delete signals;
+    rows of a deleted student or course cascade away with it. Use the
+    rebuild_attendance_summary command to verify or rebuild it.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_summaries')
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    last_marked = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ('student', 'course')
+        verbose_name_plural = 'attendance summaries'
+    
+    def __str__(self):
+        return f"{self.student} - {self.course.course_code}: {self.present}/{self.total}"
+    
+    @property
+    def absent(self):
+        return self.total - self.present
+    
+    @property
+    def percentage(self):
+        return (self.present / self.total * 100) if self.total > 0 else 0
+    
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Add record count changes to the summaries.
+        
+        ``deltas`` maps (student_id, course_id) to a (total, present) pair of
+        increments. Missing summary rows are created first, then rows sharing
+        the same increments are updated together with a single UPDATE.
+        Decrements (deleted records) only touch existing rows, and remove
+        those left without records.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+        if not deltas:
+            return
+        
+        cls.objects.bulk_create(
+            [
+                cls(student_id=student_id, course_id=course_id)
+                for (student_id, course_id), (total, _) in deltas.items() if total >= 0
+            ],
+            ignore_conflicts=True
+        )
+        
+        groups = {}
+        for (student_id, course_id), delta in deltas.items():
+            groups.setdefault((course_id, delta), []).append(student_id)
+        
+        now = timezone.now()
+        for (course_id, (total, present)), student_ids in groups.items():
+            changes = {'total': F('total') + total, 'present': F('present') + present}
+            if total > 0:
+                changes['last_marked'] = now
+            cls.objects.filter(course_id=course_id, student_id__in=student_ids).update(**changes)
+            if total < 0:
+                # As rebuilt, a student without records has no summary
+                cls.objects.filter(course_id=course_id, student_id__in=student_ids, total=0).delete()
+
 class Assignment(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -298,6 +587,16 @@ class AssignmentSubmission(models.Model):
     
     class Meta:
         unique_together = ['assignment', 'student']
+        indexes = [
+            models.Index(fields=['assignment', 'marks']),
+        ]
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .activity import assignment_submitted
+            assignment_submitted(self)
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.assignment.title}"
@@ -347,6 +646,11 @@ class Notice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', '-created_at']),
+        ]
+    
     def __str__(self):
         return self.title
     
@@ -434,9 +738,47 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.user.email}"
-    
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'read', '-created_at']),
+        ]
+
+class CourseNotification(models.Model):
+    """A notification stored once per course instead of once per student.
+
+    Without a session it is shown to every student enrolled in the course.
+    With a session it is an absence notice, shown to the students currently
+    marked absent in that session: it is created with the first absence,
+    and a student later marked present no longer sees it. Read state is
+    kept per user in CourseNotificationRead.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='course_notifications')
+    session = models.OneToOneField(AttendanceSession, on_delete=models.CASCADE, null=True, blank=True, related_name='absence_notification')
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    related_id = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} - {self.course.course_code}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['course', '-created_at']),
+        ]
+
+class CourseNotificationRead(models.Model):
+    """Marks a course notification as read by one user"""
+    notification = models.ForeignKey(CourseNotification, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('notification', 'user')
 
 class AttendanceReport(models.Model):
     """Model to store generated attendance reports"""
@@ -444,7 +786,19 @@ class AttendanceReport(models.Model):
         ('student', 'Individual Student'),
         ('course', 'Course Report'),
         ('department', 'Department Report'),
-        ('custom', 'Custom Report')
+        ('custom', 'Custom Report'),
+        ('grades', 'Course Grades'),
+        ('performance', 'Overall Performance')
+    ]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
     ]
     
     title = models.CharField(max_length=200)
@@ -455,9 +809,14 @@ class AttendanceReport(models.Model):
     department = models.CharField(max_length=100, null=True, blank=True)
     start_date = models.DateField()
     end_date = models.DateField()
-    report_file = models.FileField(upload_to='attendance_reports/', null=True, blank=True)
+    report_file = models.FileField(upload_to=report_file_path, storage=private_storage, null=True, blank=True)
     report_data = models.JSONField(null=True, blank=True)
+    # Type, course, date range and data version; identical requests share a job
+    params_key = models.CharField(max_length=100, db_index=True, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.title} - {self.report_type} ({self.start_date} to {self.end_date})"
@@ -470,4 +829,229 @@ class Message(models.Model):
     read_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
-        ordering = ['-sent_at']
\ No newline at end of file
+        ordering = ['-sent_at']
+
+class ChatMessage(models.Model):
+    """A message posted in a course chat room"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='chat_messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
+    content = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['course', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.sender} in {self.course.course_code}: {self.content[:50]}"
+
+class ActivityEvent(models.Model):
+    """Append-only feed entry for something that happened in a course.
+    
+    Written next to the activity itself (see attendance.activity), so feeds
+    are one indexed query instead of a merge of every source table.
+    """
+    ATTENDANCE = 'attendance'
+    SUBMISSION = 'submission'
+    EVENT_TYPES = [
+        (ATTENDANCE, 'Attendance Marked'),
+        (SUBMISSION, 'Assignment Submission'),
+    ]
+    
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='activity_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True)
+    # Details of the event, e.g. the attendance status or the assignment title
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'created_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} in {self.course.course_code} at {self.created_at}"
+
+class OutboxEmail(models.Model):
+    """An outgoing email waiting for (or done with) delivery by a mail worker"""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+    
+    job_id = models.CharField(max_length=32, db_index=True)
+    # Who queued the job; only they can follow its progress
+    queued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['claimed_by']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
+
+class StudentImport(models.Model):
+    """A CSV/XLSX file of new students, imported by a background job (see attendance.imports)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Imported and existing students in the file are enrolled here, if set
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True)
+    # Removed once the import has run
+    file = models.FileField(upload_to=student_import_path, storage=private_storage, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total_rows = models.PositiveIntegerField(default=0)
+    students_created = models.PositiveIntegerField(default=0)
+    students_enrolled = models.PositiveIntegerField(default=0)
+    # One {'row', 'student_id', 'email', 'error'} per row that was not imported
+    row_errors = models.JSONField(default=list)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+def _enrollment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump the data version of courses whose enrollment changed, from any
+    write path (views, admin, shell) that goes through Course.students"""
+    if action == 'pre_clear' and reverse:
+        # Which courses a student leaves is unknown after the clear
+        instance._cleared_course_ids = list(instance.courses.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Course.bump_data_version(instance.pk)
+    elif action == 'post_clear':
+        Course.bump_data_version(*getattr(instance, '_cleared_course_ids', []))
+    elif pk_set:
+        Course.bump_data_version(*pk_set)
+
+m2m_changed.connect(_enrollment_changed, sender=Course.students.through)
+
+
+def _origin_model(origin):
+    """The model a delete was started on (origin is an instance or a queryset)"""
+    return origin.model if isinstance(origin, models.QuerySet) else type(origin)
+
+
+def _session_deleted(sender, instance, origin=None, **kwargs):
+    """Subtract a deleted session's records from the summaries in one pass,
+    unless the whole course is going, summaries included"""
+    if origin is not None and issubclass(_origin_model(origin), Course):
+        return
+    counts = AttendanceRecord.objects.filter(session=instance).values('student_id').annotate(
+        total=Count('id'), present=Count('id', filter=Q(status=True))
+    ).order_by()
+    AttendanceSummary.apply_deltas({
+        (row['student_id'], instance.course_id): (-row['total'], -row['present'])
+        for row in counts
+    })
+    Course.bump_data_version(instance.course_id)
+
+
+def _record_deleted(sender, instance, origin=None, **kwargs):
+    """Subtract a deleted record from its summary, and an absence from the
+    student's unread count. Records deleted with their session are handled by
+    _session_deleted and the absence notification's own delete; with their
+    student, the summary goes too."""
+    if origin is not None and not issubclass(_origin_model(origin), AttendanceRecord):
+        return
+    course_id = instance.session.course_id
+    AttendanceSummary.apply_deltas({
+        (instance.student_id, course_id): (-1, -int(_as_bool(instance.status)))
+    })
+    Course.bump_data_version(course_id)
+    if not _as_bool(instance.status):
+        # The student no longer sees the session's absence notification
+        from .notifications import absence_audience_changed
+        absence_audience_changed(instance.session, present_student_ids=[instance.student_id])
+
+# pre_delete, as a session's records are gone by post_delete
+pre_delete.connect(_session_deleted, sender=AttendanceSession)
+post_delete.connect(_record_deleted, sender=AttendanceRecord)
+
+
+def _course_data_saved(sender, instance, **kwargs):
+    """Bump the data version of the course an enrollment, assignment,
+    submission or grade belongs to, from any write path that goes through
+    the model"""
+    course_id = instance.assignment.course_id if sender is AssignmentSubmission else instance.course_id
+    Course.bump_data_version(course_id)
+
+
+def _course_data_deleted(sender, instance, origin=None, **kwargs):
+    """As _course_data_saved, for deletes, cascades and QuerySet.delete()
+    included. Nothing is left to invalidate when the course itself goes,
+    and an assignment's submissions are covered by the assignment's bump."""
+    if origin is not None:
+        origin_model = _origin_model(origin)
+        if issubclass(origin_model, Course) or (sender is AssignmentSubmission and issubclass(origin_model, Assignment)):
+            return
+    _course_data_saved(sender, instance)
+
+for model in (Enrollment, Assignment, AssignmentSubmission, Grade):
+    post_save.connect(_course_data_saved, sender=model)
+    post_delete.connect(_course_data_deleted, sender=model)
+
+
+def _notification_saved(sender, instance, created, raw=False, **kwargs):
+    """Count and push notifications however they are created (see
+    attendance.notifications). Absence notifications are bulk-created without
+    signals and counted per student as they are marked absent."""
+    if raw:
+        return
+    from . import notifications
+    if sender is Notification:
+        notifications.personal_notification_saved(instance, created)
+    elif created:
+        notifications.course_notification_created(instance)
+
+
+def _notification_deleted(sender, instance, **kwargs):
+    from . import notifications
+    if sender is Notification:
+        notifications.personal_notification_deleted(instance)
+    else:
+        notifications.course_notification_deleted(instance)
+
+post_save.connect(_notification_saved, sender=Notification)
+post_save.connect(_notification_saved, sender=CourseNotification)
+post_delete.connect(_notification_deleted, sender=Notification)
+# pre_delete, as a session's records and the read marks go in the same cascade
+pre_delete.connect(_notification_deleted, sender=CourseNotification)
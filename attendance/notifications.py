@@ -0,0 +1,276 @@
+"""
+Reading, creating and pushing notifications.
+
+Personal notifications are Notification rows, one per user. Notifications
+that concern a whole course (new resources, absences in a session) are
+stored once as CourseNotification and merged into each student's list when
+it is read, with read state kept per user in CourseNotificationRead. A
+student sees the course-wide ones created since they enrolled.
+
+Every user's unread count is kept in User.unread_notifications, adjusted
+whenever a notification is created, read or deleted or its audience
+changes; creation and deletion are caught by signal handlers, so the admin
+and cascades are covered. New notifications and count changes are pushed to
+the browser through channel groups (see NotificationConsumer and the
+notification_stream view).
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Greatest
+from django.urls import reverse
+
+from .models import (
+    AttendanceRecord, Course, CourseNotification, CourseNotificationRead, Enrollment, Notification, Student, User
+)
+from .tasks import submit
+
+logger = logging.getLogger('attendance')
+
+# Notifications shown by the notifications view
+RECENT_LIMIT = 50
+
+
+def user_group_name(user_id):
+    return f'notifications_user_{user_id}'
+
+
+def course_group_name(course_id):
+    return f'notifications_course_{course_id}'
+
+
+def notification_groups(user):
+    """Channel groups a user's notification socket or stream listens to"""
+    groups = [user_group_name(user.id)]
+    if user.user_type == 'student':
+        groups += [
+            course_group_name(course_id)
+            for course_id in Course.objects.filter(students__user=user).values_list('id', flat=True)
+        ]
+    return groups
+
+
+def serialize(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'read': notification.read,
+        'mark_read_url': notification.mark_read_url
+    }
+
+
+# Pushing
+
+def _push(groups_events):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for group, event in groups_events:
+        async_to_sync(channel_layer.group_send)(group, {'type': 'notification_event', 'event': event})
+
+
+def _push_to_users(user_ids, event=None):
+    """Send each user their current unread count, with ``event`` if given"""
+    groups_events = [
+        (user_group_name(user_id), dict(event or {'type': 'unread_count'}, unread_count=count))
+        for user_id, count in User.objects.filter(id__in=user_ids).values_list('id', 'unread_notifications')
+    ]
+    _push(groups_events)
+
+
+def _after_commit(fn, *args):
+    # Pushing waits on the channel layer, keep it out of the request
+    transaction.on_commit(lambda: submit(fn, *args))
+
+
+def _adjust_unread(user_ids, delta):
+    if not user_ids:
+        return
+    User.objects.filter(id__in=user_ids).update(
+        unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+    )
+
+
+# Creating
+
+def notify_course(course, title, message, notification_type, related_id=None):
+    """Notify every student enrolled in a course with a single row"""
+    # Counted and pushed by course_notification_created
+    return CourseNotification.objects.create(
+        course=course,
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        related_id=related_id
+    )
+
+
+# Upkeep of the unread counts, from the signal handlers in attendance.models,
+# so notifications created or deleted anywhere (admin, shell, cascades) count
+
+def _audience(notification):
+    """Ids of the users who can see a course notification and haven't read it"""
+    if notification.session_id is None:
+        students = Enrollment.objects.filter(
+            course_id=notification.course_id, enrolled_at__lte=notification.created_at
+        ).values('student_id')
+    else:
+        students = AttendanceRecord.objects.filter(session_id=notification.session_id, status=False).values('student_id')
+    read = CourseNotificationRead.objects.filter(notification=notification).values('user_id')
+    return list(User.objects.filter(student__in=students).exclude(id__in=read).values_list('id', flat=True))
+
+
+def personal_notification_saved(notification, created):
+    if not created:
+        # E.g. read toggled in the admin
+        recount_unread([notification.user])
+        return
+    if not notification.read:
+        _adjust_unread([notification.user_id], 1)
+    notification.mark_read_url = reverse('attendance:mark_notification_read', args=[notification.id])
+    _after_commit(_push_to_users, [notification.user_id], {'type': 'notification', 'notification': serialize(notification)})
+
+
+def personal_notification_deleted(notification):
+    if not notification.read:
+        _adjust_unread([notification.user_id], -1)
+        _after_commit(_push_to_users, [notification.user_id])
+
+
+def course_notification_created(notification):
+    notification.read = False
+    notification.mark_read_url = reverse('attendance:mark_course_notification_read', args=[notification.id])
+    event = {'type': 'notification', 'notification': serialize(notification)}
+    user_ids = _audience(notification)
+    _adjust_unread(user_ids, 1)
+    if notification.session_id is None:
+        # One group send reaches every enrolled student; clients add the delta
+        _after_commit(_push, [(course_group_name(notification.course_id), dict(event, unread_delta=1))])
+    elif user_ids:
+        _after_commit(_push_to_users, user_ids, event)
+
+
+def course_notification_deleted(notification):
+    """Runs before the delete, while its audience can still be worked out"""
+    user_ids = _audience(notification)
+    _adjust_unread(user_ids, -1)
+    if user_ids:
+        _after_commit(_push_to_users, user_ids)
+
+
+def absence_audience_changed(session, absent_student_ids=(), present_student_ids=()):
+    """Update unread counts after students became absent, or stopped being
+    absent, in a session; they gain or lose its absence notification.
+
+    Runs a fixed number of queries however many students changed.
+    """
+    absent_student_ids, present_student_ids = set(absent_student_ids), set(present_student_ids)
+    if not absent_student_ids and not present_student_ids:
+        return
+    notification = CourseNotification.objects.filter(session=session).first()
+    if notification is None:
+        return
+
+    user_ids = dict(Student.objects.filter(
+        id__in=absent_student_ids | present_student_ids
+    ).values_list('id', 'user_id'))
+    already_read = set(CourseNotificationRead.objects.filter(
+        notification=notification,
+        user_id__in=user_ids.values()
+    ).values_list('user_id', flat=True))
+    gained = [user_ids[s] for s in absent_student_ids if s in user_ids and user_ids[s] not in already_read]
+    lost = [user_ids[s] for s in present_student_ids if s in user_ids and user_ids[s] not in already_read]
+    _adjust_unread(gained, 1)
+    _adjust_unread(lost, -1)
+
+    notification.read = False
+    notification.mark_read_url = reverse('attendance:mark_course_notification_read', args=[notification.id])
+    if gained:
+        _after_commit(_push_to_users, gained, {'type': 'notification', 'notification': serialize(notification)})
+    if lost:
+        _after_commit(_push_to_users, lost)
+
+
+# Reading
+
+def course_notifications(user):
+    """Course notifications visible to a user, annotated with ``read``"""
+    student = getattr(user, 'student', None) if user.user_type == 'student' else None
+    if student is None:
+        return CourseNotification.objects.none()
+
+    enrollments = Enrollment.objects.filter(student_id=student.id)
+    # Course-wide notices from before the student joined the course don't concern them
+    enrolled_before = enrollments.filter(course_id=OuterRef('course_id'), enrolled_at__lte=OuterRef('created_at'))
+    absent = AttendanceRecord.objects.filter(student_id=student.id, status=False).values('session_id')
+    return CourseNotification.objects.filter(
+        Q(Exists(enrolled_before), session__isnull=True, course_id__in=enrollments.values('course_id')) |
+        Q(session_id__in=absent)
+    ).annotate(
+        read=Exists(CourseNotificationRead.objects.filter(notification=OuterRef('pk'), user=user))
+    )
+
+
+def recent_notifications(user, limit=RECENT_LIMIT):
+    """The user's newest personal and course notifications, newest first.
+
+    Each item gets a ``mark_read_url`` so templates and JSON clients don't
+    need to know which kind it is.
+    """
+    personal = list(Notification.objects.filter(user=user).order_by('-created_at')[:limit])
+    for notification in personal:
+        notification.mark_read_url = reverse('attendance:mark_notification_read', args=[notification.id])
+
+    shared = list(course_notifications(user).order_by('-created_at')[:limit])
+    for notification in shared:
+        notification.mark_read_url = reverse('attendance:mark_course_notification_read', args=[notification.id])
+
+    return sorted(personal + shared, key=lambda n: n.created_at, reverse=True)[:limit]
+
+
+def unread_notification_count(user):
+    """Count unread notifications with queries; User.unread_notifications caches this"""
+    return (
+        Notification.objects.filter(user=user, read=False).count() +
+        course_notifications(user).filter(read=False).count()
+    )
+
+
+def recount_unread(users):
+    """Recompute the cached unread count of users whose audience changed
+    in ways that aren't tracked incrementally (e.g. enrollment)"""
+    for user in users:
+        count = unread_notification_count(user)
+        User.objects.filter(pk=user.pk).update(unread_notifications=count)
+        user.unread_notifications = count
+    user_ids = [user.id for user in users]
+    _after_commit(_push_to_users, user_ids)
+
+
+def read_notification(user, notification_id):
+    """Mark a personal notification read; False if it isn't the user's"""
+    with transaction.atomic():
+        notification = Notification.objects.filter(id=notification_id, user=user).first()
+        if notification is None:
+            return False
+        if Notification.objects.filter(id=notification_id, read=False).update(read=True):
+            _adjust_unread([user.id], -1)
+            _after_commit(_push_to_users, [user.id])
+    return True
+
+
+def read_course_notification(user, notification_id):
+    """Mark a course notification read for a user; False if they can't see it"""
+    if not course_notifications(user).filter(id=notification_id).exists():
+        return False
+    with transaction.atomic():
+        _, created = CourseNotificationRead.objects.get_or_create(notification_id=notification_id, user=user)
+        if created:
+            _adjust_unread([user.id], -1)
+            _after_commit(_push_to_users, [user.id])
+    return True
@@ -0,0 +1,84 @@
+"""
+QR codes for attendance sessions, rendered off the request path.
+
+Saving a session enqueues its render on the background worker pool. Renders
+are cached by session_uuid: a PNG already in storage is reused, and a render
+that is in flight is never started twice.
+"""
+import logging
+import threading
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+
+from . import tasks
+
+logger = logging.getLogger('attendance')
+
+QR_PLACEHOLDER = 'img/qr-pending.svg'
+
+_renders = {}
+_renders_lock = threading.RLock()
+
+
+def qr_filename(session_uuid):
+    return f'session_qrcodes/session_qr_{session_uuid}.png'
+
+
+def render_qr_png(data):
+    """Render ``data`` as a QR code and return the PNG bytes"""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _render_session_qr(session_pk, session_uuid):
+    from .models import AttendanceSession
+
+    name = qr_filename(session_uuid)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(render_qr_png(str(session_uuid))))
+    AttendanceSession.objects.filter(pk=session_pk).update(qr_code=name)
+    logger.debug(f'Rendered QR code for session {session_pk}')
+    return name
+
+
+def _forget(session_uuid, future):
+    # Finished renders live in storage; failed ones may be retried
+    with _renders_lock:
+        if _renders.get(session_uuid) is future:
+            del _renders[session_uuid]
+
+
+def enqueue_session_qr(session):
+    """Queue the QR render for a session unless it exists or is in progress"""
+    if session.qr_code:
+        return None
+    with _renders_lock:
+        future = _renders.get(session.session_uuid)
+        if future is None:
+            future = tasks.submit(_render_session_qr, session.pk, session.session_uuid)
+            _renders[session.session_uuid] = future
+            future.add_done_callback(lambda f, key=session.session_uuid: _forget(key, f))
+    return future
+
+
+def qr_code_url(session):
+    """URL of the session's QR code, or of a placeholder while it renders"""
+    if session.qr_code:
+        return session.qr_code.url
+    return static(QR_PLACEHOLDER)
@@ -0,0 +1,269 @@
+"""
+CSV reports for generate_report, rendered by background jobs.
+
+Each report is built from a fixed number of grouped queries, however many
+students it covers, and its rows are produced lazily and written straight
+to a file. request_report() records the job as an AttendanceReport and runs
+it on the worker pool; an identical request (same type, course and date
+range, over unchanged course data) gets the queued, running or recently
+finished job back instead of a new one. Course data versions do not cover
+every input (e.g. renamed students), so finished reports are only reused
+for REUSE_FOR. The file ends up in report_file, in private storage that
+only the download_report view serves, and summary numbers in report_data.
+"""
+import csv
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Avg, Count, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .cache import college_version, course_versions
+from .models import AttendanceRecord, AttendanceReport, AttendanceSession, Grade, Student
+from .tasks import submit
+
+logger = logging.getLogger('attendance')
+
+# Students fetched per query while writing a report
+CHUNK_SIZE = 2000
+# Finished reports are handed out again for identical requests for this long
+REUSE_FOR = timedelta(seconds=getattr(settings, 'REPORT_REUSE_SECONDS', 3600))
+# Jobs still queued or running after this are assumed lost with their worker
+STALE_AFTER = timedelta(minutes=15)
+
+# generate_report's ?type= values and the AttendanceReport.report_type they produce
+REPORT_TYPES = {
+    'attendance': 'course',
+    'grades': 'grades',
+    'performance': 'performance',
+}
+
+ATTENDANCE_HEADER = ['Student ID', 'Name', 'Total Sessions', 'Present', 'Absent', 'Percentage']
+GRADES_HEADER = ['Student ID', 'Name', 'Grade', 'Percentage', 'Remarks']
+PERFORMANCE_HEADER = ['Student ID', 'Name', 'Department', 'Average Grade', 'Overall Attendance', 'Total Courses']
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line back"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    """Yield a CSV file one line at a time"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _attendance_counts(records):
+    """{student_id: (total, present)} in one grouped query"""
+    return {
+        student_id: (total, present)
+        for student_id, total, present in records.values('student_id').annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status=True))
+        ).values_list('student_id', 'total', 'present').order_by()
+    }
+
+
+def _percentage(part, total):
+    return (part / total * 100) if total > 0 else 0
+
+
+def _records_between(start_date=None, end_date=None):
+    records = AttendanceRecord.objects.all()
+    if start_date:
+        records = records.filter(session__date__gte=start_date)
+    if end_date:
+        records = records.filter(session__date__lte=end_date)
+    return records
+
+
+def course_attendance_rows(course, start_date=None, end_date=None):
+    """Attendance totals for every student enrolled in a course"""
+    counts = _attendance_counts(_records_between(start_date, end_date).filter(session__course=course))
+    students = course.students.order_by('student_id').values_list(
+        'id', 'student_id', 'user__first_name', 'user__last_name'
+    )
+    for pk, student_id, first_name, last_name in students.iterator(chunk_size=CHUNK_SIZE):
+        total, present = counts.get(pk, (0, 0))
+        yield [
+            student_id,
+            f'{first_name} {last_name}'.strip(),
+            total,
+            present,
+            total - present,
+            f"{_percentage(present, total):.2f}%"
+        ]
+
+
+def course_grade_rows(course):
+    """Every grade recorded in a course"""
+    grades = Grade.objects.filter(course=course).values_list(
+        'student__student_id', 'student__user__first_name', 'student__user__last_name',
+        'grade', 'percentage', 'remarks'
+    )
+    for student_id, first_name, last_name, grade, percentage, remarks in grades.iterator(chunk_size=CHUNK_SIZE):
+        yield [student_id, f'{first_name} {last_name}'.strip(), grade, percentage, remarks]
+
+
+def performance_rows(start_date=None, end_date=None):
+    """Average grade, overall attendance and course count for every student"""
+    counts = _attendance_counts(_records_between(start_date, end_date))
+    average_grade = Grade.objects.filter(student=OuterRef('pk')).values('student').annotate(
+        average=Avg('percentage')
+    ).values('average')
+    students = Student.objects.annotate(
+        average_grade=Subquery(average_grade),
+        course_count=Count('courses')
+    ).order_by('student_id').values_list(
+        'id', 'student_id', 'user__first_name', 'user__last_name', 'department', 'average_grade', 'course_count'
+    )
+    for pk, student_id, first_name, last_name, department, average, course_count in students.iterator(chunk_size=CHUNK_SIZE):
+        total, present = counts.get(pk, (0, 0))
+        yield [
+            student_id,
+            f'{first_name} {last_name}'.strip(),
+            department,
+            f"{average or 0:.2f}%",
+            f"{_percentage(present, total):.2f}%",
+            course_count
+        ]
+
+
+def default_date_range(course=None):
+    """From the first attendance session (of the course, if given) up to today"""
+    sessions = AttendanceSession.objects.all()
+    if course:
+        sessions = sessions.filter(course=course)
+    end_date = timezone.localdate()
+    start_date = sessions.aggregate(first=Min('date'))['first'] or end_date
+    return min(start_date, end_date), end_date
+
+
+def params_key(report_type, course, start_date, end_date):
+    """Identifies a report and the version of the data it is computed from"""
+    if course:
+        version = course_versions([course.id]).get(course.id, 0)
+    else:
+        version = college_version()
+    return f'{report_type}:{course.id if course else "-"}:{start_date.isoformat()}:{end_date.isoformat()}:v{version}'
+
+
+def request_report(user, kind, course, start_date, end_date):
+    """Queue a report job, or find an identical one to reuse.
+
+    ``kind`` is one of REPORT_TYPES. Returns (report, reused).
+    """
+    report_type = REPORT_TYPES[kind]
+    key = params_key(report_type, course, start_date, end_date)
+    now = timezone.now()
+    existing = AttendanceReport.objects.filter(params_key=key).filter(
+        Q(status=AttendanceReport.DONE, created_at__gte=now - REUSE_FOR) |
+        Q(status__in=[AttendanceReport.PENDING, AttendanceReport.RUNNING], created_at__gte=now - STALE_AFTER)
+    ).order_by('-created_at').first()
+    if existing:
+        return existing, True
+
+    if report_type == 'performance':
+        title = 'Overall performance report'
+    elif report_type == 'grades':
+        title = f'Grades report for {course.course_code}'
+    else:
+        title = f'Attendance report for {course.course_code}'
+    report = AttendanceReport.objects.create(
+        title=title,
+        report_type=report_type,
+        generated_by=user,
+        course=course,
+        start_date=start_date,
+        end_date=end_date,
+        params_key=key
+    )
+    transaction.on_commit(lambda: submit(run_report, report.id))
+    return report, False
+
+
+def _attendance_summary(records):
+    totals = records.aggregate(
+        sessions=Count('session', distinct=True),
+        records=Count('id'),
+        present=Count('id', filter=Q(status=True))
+    )
+    totals['attendance_percentage'] = round(_percentage(totals['present'], totals['records']), 2)
+    return totals
+
+
+def _render(report):
+    """(filename, header, rows, summary) for a report"""
+    start_date, end_date = report.start_date, report.end_date
+    course = report.course
+    if report.report_type == 'performance':
+        summary = _attendance_summary(_records_between(start_date, end_date))
+        summary['students'] = Student.objects.count()
+        average = Grade.objects.aggregate(average=Avg('percentage'))['average']
+        summary['average_grade'] = round(float(average or 0), 2)
+        return (
+            f'overall_performance_report_{start_date}_{end_date}.csv',
+            PERFORMANCE_HEADER, performance_rows(start_date, end_date), summary
+        )
+    if report.report_type == 'grades':
+        summary = Grade.objects.filter(course=course).aggregate(grades=Count('id'), average=Avg('percentage'))
+        summary['average'] = round(float(summary['average'] or 0), 2)
+        return f'grades_report_{course.course_code}.csv', GRADES_HEADER, course_grade_rows(course), summary
+    summary = _attendance_summary(_records_between(start_date, end_date).filter(session__course=course))
+    summary['students'] = course.students.count()
+    return (
+        f'attendance_report_{course.course_code}_{start_date}_{end_date}.csv',
+        ATTENDANCE_HEADER, course_attendance_rows(course, start_date, end_date), summary
+    )
+
+
+def run_report(report_id):
+    """Render a queued report to report_file and store its summary in report_data"""
+    # Only one worker gets to move a job out of pending
+    if not AttendanceReport.objects.filter(id=report_id, status=AttendanceReport.PENDING).update(
+        status=AttendanceReport.RUNNING
+    ):
+        return
+    report = AttendanceReport.objects.select_related('course').get(id=report_id)
+    try:
+        filename, header, rows, summary = _render(report)
+        with tempfile.TemporaryFile() as output:
+            row_count = -1
+            for line in csv_lines(header, rows):
+                output.write(line.encode())
+                row_count += 1
+            report.report_file.save(filename, File(output), save=False)
+        report.report_data = {'rows': row_count, **summary}
+        report.status = AttendanceReport.DONE
+        logger.info(f'Report {report.id} ({report.params_key}) finished with {row_count} rows')
+    except Exception as e:
+        report.status = AttendanceReport.FAILED
+        report.error = str(e)
+        logger.error(f'Report {report.id} ({report.params_key}) failed: {str(e)}', exc_info=True)
+    report.completed_at = timezone.now()
+    report.save(update_fields=['report_file', 'report_data', 'status', 'error', 'completed_at'])
+
+
+def report_status(report):
+    """JSON-ready description of a report job"""
+    return {
+        'report_id': report.id,
+        'title': report.title,
+        'report_type': report.report_type,
+        'status': report.status,
+        'start_date': report.start_date.isoformat(),
+        'end_date': report.end_date.isoformat(),
+        'created_at': report.created_at.isoformat(),
+        'completed_at': report.completed_at.isoformat() if report.completed_at else None,
+        'summary': report.report_data,
+        'error': report.error,
+    }
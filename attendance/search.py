@@ -0,0 +1,70 @@
+"""
+Student search for the faculty autocomplete and enrollment checks.
+
+Students are indexed in two SQLite FTS5 tables that triggers keep in sync
+(migration 0013), so bulk inserts and raw SQL are covered too.
+attendance_student_search holds whole words for prefix queries ("jo smi"),
+and attendance_student_trigram matches any substring of three or more
+characters, as icontains did. Word-prefix matches rank first, then substring
+matches, each ordered by bm25. Scoring costs time per hit, so a query
+matching more than RANK_LIMIT students (e.g. the first two letters of a
+common name) returns its first hits unranked; such terms tell bm25 little
+about which student is meant anyway.
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .models import Student
+
+PREFIX_TABLE = 'attendance_student_search'
+TRIGRAM_TABLE = 'attendance_student_trigram'
+# bm25 weights of the indexed columns: student_id, name, email
+WEIGHTS = '4.0, 2.0, 1.0'
+# Hits above which results are not ranked
+RANK_LIMIT = 1000
+
+
+def _quote(text):
+    """An FTS5 string, so user input is never parsed as query syntax"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _match(table, expression, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {table} WHERE {table} MATCH %s LIMIT %s', [expression, RANK_LIMIT + 1])
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) > RANK_LIMIT or len(ids) <= 1:
+            return ids[:limit]
+        cursor.execute(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}, {WEIGHTS}) LIMIT %s',
+            [expression, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def student_ids(query, limit=10):
+    """Ids of the students best matching ``query``, best first"""
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    if connection.vendor != 'sqlite':
+        return list(Student.objects.filter(
+            Q(user__first_name__icontains=query) |
+            Q(user__last_name__icontains=query) |
+            Q(student_id__icontains=query)
+        ).values_list('id', flat=True)[:limit])
+
+    ids = _match(PREFIX_TABLE, ' AND '.join(f'{_quote(term)}*' for term in query.split()), limit)
+    # Trigrams need three characters
+    if len(ids) < limit and len(query) >= 3:
+        for student_id in _match(TRIGRAM_TABLE, _quote(query), limit + len(ids)):
+            if student_id not in ids:
+                ids.append(student_id)
+    return ids[:limit]
+
+
+def find_students(query, limit=10):
+    """Students best matching ``query``, best first, with their users loaded"""
+    ids = student_ids(query, limit)
+    students = Student.objects.select_related('user').in_bulk(ids)
+    return [students[student_id] for student_id in ids if student_id in students]
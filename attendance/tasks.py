@@ -0,0 +1,134 @@
+"""
+Small in-process helpers for work that should not run inside a request.
+
+Jobs run on a shared thread pool; each job gets fresh database connections
+and its exceptions are logged instead of being lost with the future.
+BatchWriter buffers writes and flushes them in batches from its own thread.
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('attendance')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 4),
+                    thread_name_prefix='attendance-worker'
+                )
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        logger.error(f'Background job {fn.__name__} failed: {str(e)}', exc_info=True)
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the worker pool and return its Future"""
+    return _get_executor().submit(_run, fn, args, kwargs)
+
+
+class BatchWriter:
+    """Collects items and hands them to ``write`` in batches from a background thread.
+
+    ``add`` never touches the database, so it is safe to call from async code.
+    A batch is written every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` items are waiting. When a batch fails, its items are
+    written one at a time, so one bad item can't hold up the rest; items
+    that still fail are retried with later flushes and dropped (with an
+    error in the log) after ``max_attempts`` tries. Whatever is still
+    waiting when the process exits is flushed then.
+    """
+
+    def __init__(self, write, flush_interval=0.5, batch_size=100, name='batch-writer', max_attempts=5):
+        self.write = write
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.name = name
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._items = []
+        self._wakeup = threading.Event()
+        self._thread = None
+        atexit.register(self._flush_at_exit)
+
+    def add(self, item):
+        with self._lock:
+            # (item, failed attempts so far)
+            self._items.append((item, 0))
+            full = len(self._items) >= self.batch_size
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    @property
+    def pending(self):
+        return len(self._items)
+
+    def flush(self):
+        """Write everything collected so far, returning the number of items written"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._items = self._items, []
+            if not entries:
+                return 0
+            try:
+                self.write([item for item, _ in entries])
+                return len(entries)
+            except Exception as e:
+                logger.warning(f'{self.name} failed to write {len(entries)} item(s), writing them one at a time: {str(e)}')
+
+            written = 0
+            retry = []
+            for item, attempts in entries:
+                try:
+                    self.write([item])
+                    written += 1
+                except Exception as e:
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        logger.error(
+                            f'{self.name} dropped {item!r} after {attempts} failed attempt(s): {str(e)}', exc_info=True
+                        )
+                    else:
+                        retry.append((item, attempts))
+            if retry:
+                with self._lock:
+                    self._items[:0] = retry
+            return written
+
+    def _flush_at_exit(self):
+        if self.pending:
+            self.flush()
+        if self.pending:
+            logger.error(f'{self.name} exited with {self.pending} item(s) unwritten')
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.pending:
+                close_old_connections()
+                self.flush()
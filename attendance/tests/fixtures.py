@@ -0,0 +1,102 @@
+"""A seeded college for the view tests: one faculty, two courses and their students"""
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+
+from django.core.mail import EmailMessage
+from django.utils import timezone
+
+from attendance import mail
+from attendance.models import (
+    Assignment, AssignmentSubmission, AttendanceRecord, AttendanceReport, AttendanceSession, ChatMessage, Course,
+    CourseNotification, Faculty, Grade, Notice, Notification, Resource, Student, StudentImport, User
+)
+
+
+def _user(username, user_type, **fields):
+    # No usable password: hashing one per user would dominate setup time
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password=None, user_type=user_type, **fields
+    )
+
+
+def make_college(students=6, sessions=5, assignments=1):
+    admin = _user('admin', 'admin', is_staff=True, is_superuser=True)
+    faculty_user = _user('faculty', 'faculty', first_name='Fay', last_name='Culty')
+    faculty = Faculty.objects.create(user=faculty_user, faculty_id='F001', department='CS')
+    courses = [
+        Course.objects.create(course_code='CS101', name='Programming', faculty=faculty),
+        Course.objects.create(course_code='CS102', name='Data Structures', faculty=faculty),
+    ]
+
+    enrolled = [
+        Student.objects.create(
+            user=_user(f'student{i}', 'student', first_name=f'Student{i}', last_name='Test'),
+            student_id=f'S{i:04d}', department='CS'
+        )
+        for i in range(students)
+    ]
+    courses[0].students.add(*enrolled)
+    courses[1].students.add(*enrolled[:students // 2])
+
+    session_list = []
+    for course in courses:
+        for day in range(sessions):
+            session = AttendanceSession.objects.create(
+                course=course, date=date(2026, 1, 5) + timedelta(days=day),
+                start_time=time(9), end_time=time(10), created_by=faculty
+            )
+            AttendanceRecord.bulk_mark(
+                session, {student: (i + day) % 3 != 0 for i, student in enumerate(course.students.all())}, faculty
+            )
+            session_list.append(session)
+
+    assignment_list = []
+    for course in courses:
+        for n in range(assignments):
+            assignment = Assignment.objects.create(
+                course=course, title=f'Homework {n + 1}', description='Solve it', max_marks=10,
+                due_date=timezone.now() + timedelta(days=7 * (n + 1))
+            )
+            for i, student in enumerate(course.students.all()[:students // 2]):
+                AssignmentSubmission.objects.create(
+                    assignment=assignment, student=student, marks=7 if i % 2 else None
+                )
+            assignment_list.append(assignment)
+
+    for student in enrolled:
+        Grade.objects.create(student=student, course=courses[0], grade='A', percentage=80 + student.id % 20)
+    Notice.objects.create(course=courses[0], title='Quiz', content='On Friday', created_by=faculty)
+    Notice.objects.create(title='Holiday', content='College closed', created_by=faculty)
+    notification = Notification.objects.create(
+        user=enrolled[0].user, title='Welcome', message='Hello', notification_type='notice'
+    )
+    course_notification = CourseNotification.objects.create(
+        course=courses[0], title='Room change', message='Lab 2', notification_type='notice'
+    )
+    resource = Resource.objects.create(
+        course=courses[0], title='Slides', file='resources/slides.pdf', uploaded_by=faculty_user
+    )
+    ChatMessage.objects.bulk_create([
+        ChatMessage(course=courses[0], sender=student.user, content=f'Question {i}')
+        for i, student in enumerate(enrolled)
+    ])
+    report = AttendanceReport.objects.create(
+        title='Attendance report for CS101', report_type='course', generated_by=admin, course=courses[0],
+        start_date=date(2026, 1, 5), end_date=date(2026, 1, 31)
+    )
+    student_import = StudentImport.objects.create(
+        uploaded_by=faculty_user, course=courses[0], filename='intake.csv', status=StudentImport.DONE,
+        total_rows=2, students_created=1,
+        row_errors=[{'row': 3, 'student_id': 'S0000', 'email': 'dup@example.com', 'error': 'Student ID already exists'}]
+    )
+    mail_job = mail.enqueue(
+        [EmailMessage('Reminder', 'Class at 9', to=[enrolled[0].user.email])], queued_by=faculty_user
+    )
+
+    return SimpleNamespace(
+        admin=admin, faculty=faculty, courses=courses, students=enrolled, sessions=session_list,
+        assignment=assignment_list[0], assignments=assignment_list,
+        submission=AssignmentSubmission.objects.filter(assignment=assignment_list[0]).first(),
+        notification=notification, course_notification=course_notification, resource=resource,
+        report=report, student_import=student_import, mail_job=mail_job
+    )
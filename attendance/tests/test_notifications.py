@@ -0,0 +1,67 @@
+"""
+Who sees course notifications, and the unread counts that follow from it.
+
+An absence notification is one row per session, shown to the students
+currently marked absent in it: marking a student present again hides it
+from them, unlike the per-student rows it replaced, which stayed forever.
+"""
+from datetime import date, time
+
+from django.test import TestCase
+
+from attendance.models import AttendanceRecord, AttendanceSession, CourseNotification, Student
+from attendance.notifications import course_notifications, notify_course, unread_notification_count
+
+from .fixtures import _user, make_college
+
+
+class CourseNotificationAudienceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = make_college(students=3, sessions=1)
+        cls.course = cls.college.courses[0]
+        cls.session = AttendanceSession.objects.create(
+            course=cls.course, date=date(2026, 3, 2), start_time=time(9), end_time=time(10),
+            created_by=cls.college.faculty
+        )
+
+    def absence_notice(self):
+        return CourseNotification.objects.get(session=self.session)
+
+    def visible_ids(self, student):
+        return set(course_notifications(student.user).values_list('id', flat=True))
+
+    def assertUnread(self, student, expected):
+        student.user.refresh_from_db()
+        self.assertEqual(student.user.unread_notifications, expected)
+        self.assertEqual(unread_notification_count(student.user), expected)
+
+    def test_absence_notice_follows_the_current_record(self):
+        first, second, _ = self.college.students
+        before = [unread_notification_count(student.user) for student in (first, second)]
+        AttendanceRecord.bulk_mark(self.session, {first: False, second: False}, self.college.faculty)
+        notice = self.absence_notice()
+        self.assertIn(notice.id, self.visible_ids(first))
+        self.assertUnread(first, before[0] + 1)
+
+        # Marked present again: the notice is gone for them, not for the others
+        AttendanceRecord.bulk_mark(self.session, {first: True}, self.college.faculty)
+        self.assertNotIn(notice.id, self.visible_ids(first))
+        self.assertIn(notice.id, self.visible_ids(second))
+        self.assertUnread(first, before[0])
+        self.assertUnread(second, before[1] + 1)
+
+    def test_absence_notice_is_dated_by_the_first_absence(self):
+        first, second, _ = self.college.students
+        AttendanceRecord.bulk_mark(self.session, {first: False}, self.college.faculty)
+        notice = self.absence_notice()
+        AttendanceRecord.bulk_mark(self.session, {second: False}, self.college.faculty)
+        self.assertEqual(self.absence_notice().created_at, notice.created_at)
+        self.assertIn(notice.id, self.visible_ids(second))
+
+    def test_course_notice_is_not_shown_to_later_enrollments(self):
+        notice = notify_course(self.course, 'Room change', 'Lab 2 from now on', 'notice')
+        late = Student.objects.create(user=_user('late', 'student'), student_id='S9999', department='CS')
+        self.course.students.add(late)
+        self.assertNotIn(notice.id, self.visible_ids(late))
+        self.assertIn(notice.id, self.visible_ids(self.college.students[0]))
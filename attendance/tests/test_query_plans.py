@@ -0,0 +1,156 @@
+"""
+Query plans of the hot views.
+
+Every SELECT a view issues is run through EXPLAIN QUERY PLAN; a full scan
+of one of the hot tables fails the test. A second set of tests pins the
+composite indexes to the filters they were added for.
+"""
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.models import (
+    ActivityEvent, AssignmentSubmission, AttendanceRecord, AttendanceSession, AttendanceSummary, Grade,
+    Notice, Notification
+)
+
+from .fixtures import make_college
+
+HOT_TABLES = {
+    model._meta.db_table
+    for model in (
+        ActivityEvent, AssignmentSubmission, AttendanceRecord, AttendanceSession, AttendanceSummary, Grade,
+        Notice, Notification
+    )
+}
+
+
+def query_plan(sql, params=()):
+    """The detail lines of EXPLAIN QUERY PLAN"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql, params=()):
+    """Plan lines that read a hot table without an index"""
+    scans = []
+    for detail in query_plan(sql, params):
+        words = detail.split()
+        # "SCAN <table> [AS alias]" without "USING [COVERING] INDEX"
+        if words[0] == 'SCAN' and 'USING' not in words and words[1] in HOT_TABLES:
+            scans.append(detail)
+    return scans
+
+
+class HotViewQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = make_college()
+
+    def assertNoFullScans(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        problems = []
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for detail in full_scans(sql):
+                problems.append(f'{detail}\n    {sql}')
+        if problems:
+            self.fail(f'{url} scans a hot table:\n' + '\n'.join(problems))
+
+    def test_faculty_views(self):
+        college = self.college
+        course = college.courses[0]
+        student = college.students[0]
+        urls = [
+            reverse('attendance:faculty_dashboard'),
+            reverse('attendance:view_active_sessions'),
+            reverse('attendance:view_pending_tasks'),
+            reverse('attendance:manage_courses'),
+            reverse('attendance:mark_attendance', kwargs={'session_id': college.sessions[0].id}),
+            reverse('attendance:view_all_students'),
+            reverse('attendance:course_students', args=[course.id]),
+            reverse('attendance:course_assignments', args=[course.id]),
+            reverse('attendance:get_course_students', args=[course.id]),
+            reverse('attendance:student_attendance', args=[student.id]),
+            reverse('attendance:view_recent_activities'),
+            reverse('attendance:notifications'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNoFullScans(college.faculty.user, url)
+
+    def test_student_views(self):
+        college = self.college
+        course = college.courses[0]
+        urls = [
+            reverse('attendance:student_dashboard'),
+            reverse('attendance:view_courses'),
+            reverse('attendance:view_assignments'),
+            reverse('attendance:view_course_assignments', args=[course.id]),
+            reverse('attendance:view_attendance'),
+            reverse('attendance:view_grades', args=[course.id]),
+            reverse('attendance:notifications'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNoFullScans(college.students[0].user, url)
+
+
+class CompositeIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = make_college()
+
+    def assertUsesIndex(self, run, model, fields):
+        """``run()`` issues one query whose plan must use the index on ``fields``"""
+        index = next(index for index in model._meta.indexes if index.fields == fields)
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        plan = query_plan(queries.captured_queries[-1]['sql'])
+        self.assertTrue(
+            any(f'INDEX {index.name} ' in f'{detail} ' for detail in plan),
+            f'{model.__name__}{fields} index not used:\n' + '\n'.join(plan)
+        )
+
+    # The ORM renders boolean filters as "status" / NOT "read" rather than
+    # equalities, so these indexes are searched on their leading column and
+    # serve the counts below as covering indexes.
+
+    def test_present_count_per_student(self):
+        records = AttendanceRecord.objects.filter(student=self.college.students[0])
+        self.assertUsesIndex(
+            lambda: list(records.values('student_id').annotate(
+                total=Count('id'), present=Count('id', filter=Q(status=True))
+            ).order_by()),
+            AttendanceRecord, ['student', 'status']
+        )
+
+    def test_present_count_per_session(self):
+        records = AttendanceRecord.objects.filter(session=self.college.sessions[0], status=True)
+        self.assertUsesIndex(records.count, AttendanceRecord, ['session', 'status'])
+
+    def test_attendance_session_by_course_and_date(self):
+        # Served by the (course, date, start_time) unique index
+        sessions = AttendanceSession.objects.filter(course=self.college.courses[0], date=self.college.sessions[0].date)
+        sql, params = sessions.query.sql_with_params()
+        self.assertTrue(any('course_id=? AND date=?' in detail for detail in query_plan(sql, params)))
+
+    def test_ungraded_submissions(self):
+        submissions = AssignmentSubmission.objects.filter(assignment=self.college.assignment, marks__isnull=True)
+        self.assertUsesIndex(submissions.count, AssignmentSubmission, ['assignment', 'marks'])
+
+    def test_unread_notification_count(self):
+        notifications = Notification.objects.filter(user=self.college.students[0].user, read=False)
+        self.assertUsesIndex(notifications.count, Notification, ['user', 'read', '-created_at'])
+
+    def test_latest_course_notices(self):
+        notices = Notice.objects.filter(course=self.college.courses[0]).order_by('-created_at')
+        self.assertUsesIndex(lambda: list(notices[:5]), Notice, ['course', '-created_at'])
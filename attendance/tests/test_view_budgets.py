@@ -0,0 +1,228 @@
+"""
+Query-count and wall-time budgets for every URL in attendance/urls.py.
+
+Each URL is requested with GET as every role (anonymous, student, faculty,
+admin) against a seeded college, with an empty cache and inside a
+transaction that is rolled back afterwards. A request fails its budget when
+its status differs from its baseline in view_budgets.json, when it issues
+more queries than the baseline, or when its median time exceeds TIME_FACTOR
+times the baseline time plus TIME_SLACK_MS.
+
+The measurements are printed as a table next to the baseline. Environment
+variables:
+
+    VIEW_BUDGETS_UPDATE=1        write the measurements as the new baseline
+    VIEW_BUDGETS_REPORT=<path>   also save them as JSON, e.g. for CI artifacts
+    VIEW_BUDGETS_TIME_FACTOR=<n> override TIME_FACTOR on slower machines
+"""
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from attendance.urls import urlpatterns
+
+from .fixtures import make_college
+
+BASELINE_PATH = Path(__file__).with_name('view_budgets.json')
+# Timed runs per request; the median is compared with the budget
+REPEAT = 3
+TIME_FACTOR = float(os.environ.get('VIEW_BUDGETS_TIME_FACTOR', 3))
+TIME_SLACK_MS = 50
+
+# Seed size: enough rows per course and student for N+1 queries to show up
+STUDENTS = 40
+SESSIONS = 12
+ASSIGNMENTS = 3
+
+
+def _routes(patterns, prefix=''):
+    """(route, name) of every URL pattern, including nested includes"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern), pattern.name
+
+
+def _consume(response):
+    """Read a streaming response to the end, as the server would"""
+    if response.is_async:
+        async def read():
+            async for _ in response.streaming_content:
+                pass
+        async_to_sync(read)()
+    else:
+        for _ in response.streaming_content:
+            pass
+
+
+def _load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+class ViewBudgetTests(TestCase):
+    measurements = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = make_college(students=STUDENTS, sessions=SESSIONS, assignments=ASSIGNMENTS)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baseline = _load_baseline()
+        cls.update = os.environ.get('VIEW_BUDGETS_UPDATE') == '1'
+        # Some views answer 500 for broken templates; that is recorded, not logged
+        cls._request_logger = logging.getLogger('django.request')
+        cls._request_log_level = cls._request_logger.level
+        cls._request_logger.setLevel(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._request_logger.setLevel(cls._request_log_level)
+        cls.write_results()
+        super().tearDownClass()
+
+    def url_values(self):
+        """Values for each URL keyword argument, taken from the seeded college"""
+        college = self.college
+        student_user = college.students[0].user
+        return {
+            'course_id': college.courses[0].id,
+            'session_id': college.sessions[0].id,
+            'student_id': college.students[0].id,
+            'assignment_id': college.assignment.id,
+            'submission_id': college.submission.id,
+            'resource_id': college.resource.id,
+            'notification_id': college.notification.id,
+            'report_id': college.report.id,
+            'import_id': college.student_import.id,
+            'job_id': college.mail_job,
+            'session_uuid': college.sessions[0].session_uuid,
+            'uidb64': urlsafe_base64_encode(force_bytes(student_user.pk)),
+            'token': default_token_generator.make_token(student_user),
+        }
+
+    def url_for(self, route, name):
+        values = self.url_values()
+        if name == 'mark_course_notification_read':
+            values['notification_id'] = self.college.course_notification.id
+        url = route
+        for key, value in values.items():
+            for converter in ('', 'int:', 'str:', 'uuid:'):
+                url = url.replace(f'<{converter}{key}>', str(value))
+        self.assertNotIn('<', url, f'No value for a parameter of {route}')
+        return '/' + url
+
+    def user_for(self, role):
+        return {
+            'anonymous': None,
+            'student': self.college.students[0].user,
+            'faculty': self.college.faculty.user,
+            'admin': self.college.admin,
+        }[role]
+
+    def request(self, user, url):
+        """One GET in a rolled-back transaction; returns (status, queries, ms)"""
+        client = Client(raise_request_exception=False)
+        with transaction.atomic():
+            if user is not None:
+                client.force_login(user)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming and response.get('Content-Type') != 'text/event-stream':
+                    _consume(response)
+                elapsed = (time.perf_counter() - started) * 1000
+            response.close()
+            transaction.set_rollback(True)
+        return response.status_code, len(queries.captured_queries), elapsed
+
+    def check_role(self, role):
+        user = self.user_for(role)
+        for route, name in _routes(urlpatterns):
+            key = f'{role} /{route}'
+            url = self.url_for(route, name)
+            runs = [self.request(user, url) for _ in range(REPEAT)]
+            status = runs[0][0]
+            query_count = max(run[1] for run in runs)
+            ms = statistics.median(run[2] for run in runs)
+            budget = self.baseline.get(key)
+            self.measurements[key] = {
+                'status': status, 'queries': query_count, 'ms': round(ms, 1), 'baseline': budget
+            }
+            if self.update:
+                continue
+            with self.subTest(role=role, route=route):
+                self.assertIsNotNone(budget, f'{key} has no baseline; run with VIEW_BUDGETS_UPDATE=1')
+                # A view that starts failing (or stops) runs a different number
+                # of queries, which says nothing about its budget
+                self.assertEqual(
+                    status, budget['status'], f'{key} answered {status}, baseline {budget["status"]}'
+                )
+                self.assertLessEqual(
+                    query_count, budget['queries'],
+                    f'{key} ran {query_count} queries, budget {budget["queries"]}'
+                )
+                time_budget = budget['ms'] * TIME_FACTOR + TIME_SLACK_MS
+                self.assertLessEqual(ms, time_budget, f'{key} took {ms:.1f} ms, budget {time_budget:.1f} ms')
+
+    def test_anonymous(self):
+        self.check_role('anonymous')
+
+    def test_student(self):
+        self.check_role('student')
+
+    def test_faculty(self):
+        self.check_role('faculty')
+
+    def test_admin(self):
+        self.check_role('admin')
+
+    @classmethod
+    def write_results(cls):
+        if not cls.measurements:
+            return
+        lines = [
+            f'{"Request":<72} {"Status":>6} {"Queries":>8} {"Base":>5} {"ms":>8} {"Base ms":>8}',
+        ]
+        for key, result in sorted(cls.measurements.items()):
+            budget = result['baseline'] or {}
+            change = ''
+            if budget and result['queries'] != budget['queries']:
+                change = ' more queries' if result['queries'] > budget['queries'] else ' fewer queries'
+            lines.append(
+                f'{key:<72} {result["status"]:>6} {result["queries"]:>8} {budget.get("queries", "-"):>5} '
+                f'{result["ms"]:>8.1f} {budget.get("ms", "-"):>8}{change}'
+            )
+        sys.stderr.write('\nView budgets\n' + '\n'.join(lines) + '\n')
+
+        current = {
+            key: {'status': result['status'], 'queries': result['queries'], 'ms': result['ms']}
+            for key, result in sorted(cls.measurements.items())
+        }
+        report_path = os.environ.get('VIEW_BUDGETS_REPORT')
+        if report_path:
+            Path(report_path).write_text(json.dumps(current, indent=2) + '\n')
+        if cls.update:
+            baseline = _load_baseline()
+            baseline.update(current)
+            BASELINE_PATH.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + '\n')
+            sys.stderr.write(f'Baseline written to {BASELINE_PATH}\n')
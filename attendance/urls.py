@@ -20,8 +20,12 @@ urlpatterns = [
     path('faculty/notices/', views.view_all_notices, name='view_all_notices'),
     path('faculty/create-session/', views.create_session, name='create_session'),
     path('faculty/mark-attendance/<int:session_id>/', views.mark_attendance, name='mark_attendance'),
+    path('faculty/session/<int:session_id>/qr-code/', views.session_qr_code, name='session_qr_code'),
     path('faculty/add-course/', views.add_course, name='add_course'),
     path('faculty/add-student/', views.add_student, name='add_student'),
+    path('faculty/import-students/', views.import_students, name='import_students'),
+    path('faculty/import-students/<int:import_id>/', views.import_status, name='import_status'),
+    path('faculty/import-students/<int:import_id>/errors/', views.import_errors, name='import_errors'),
     path('faculty/mark-attendance/', views.mark_attendance, name='mark_attendance_form'),
     path('faculty/manage-grades/', views.manage_grades, name='manage_grades'),
     path('faculty/course-students/<int:course_id>/', views.course_students, name='view_course_students'),
@@ -30,6 +34,7 @@ urlpatterns = [
     path('faculty/student/<int:student_id>/attendance/', views.student_attendance, name='student_attendance'),
     path('faculty/student/<int:student_id>/grades/', views.student_grades, name='student_grades'),
     path('student/view-attendance/', views.view_attendance, name='view_attendance'),
+    path('student/check-in/<uuid:session_uuid>/', views.self_check_in, name='self_check_in'),
     path('student/grades/<int:course_id>/', views.view_grades, name='view_grades'),
     path('student/submit-assignment/<int:assignment_id>/', views.submit_assignment, name='submit_assignment'),
     path('faculty/create-assignment/<int:course_id>/', views.create_assignment, name='create_assignment'),
@@ -46,9 +51,11 @@ urlpatterns = [
     path('faculty/student-attendance-history/<int:student_id>/', views.student_attendance_history, name='student_attendance_history'),
     path('faculty/export-attendance/<int:session_id>/', views.export_attendance, name='export_attendance'),
     path('faculty/send-attendance-notifications/<int:session_id>/', views.send_attendance_notifications, name='send_attendance_notifications'),
+    path('faculty/mail-jobs/<str:job_id>/', views.mail_job_status, name='mail_job_status'),
     
     # Chat & Resource Management
     path('course/<int:course_id>/chat/', views.chat_room, name='chat_room'),
+    path('course/<int:course_id>/chat/history/', views.chat_history, name='chat_history'),
     path('course/<int:course_id>/resources/', views.course_resources, name='course_resources'),
     path('faculty/upload-resource/<int:course_id>/', views.upload_resource, name='upload_resource'),
     path('faculty/delete-resource/<int:resource_id>/', views.delete_resource, name='delete_resource'),
@@ -56,6 +63,8 @@ urlpatterns = [
     # Notifications
     path('notifications/', views.notifications, name='notifications'),
     path('notifications/<int:notification_id>/mark-read/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/course/<int:notification_id>/mark-read/', views.mark_course_notification_read, name='mark_course_notification_read'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
     
     # Password Reset
     path('password-reset/', views.password_reset_request, name='password_reset'),
@@ -64,7 +73,10 @@ urlpatterns = [
     path('password-reset/complete/', views.password_reset_complete, name='password_reset_complete'),
     
     # Reports
-    path('admin/generate-report/', views.generate_report, name='generate_report'),
+    path('reports/generate/', views.generate_report, name='generate_report'),
+    path('reports/<int:report_id>/', views.report_status, name='report_status'),
+    path('reports/<int:report_id>/download/', views.download_report, name='download_report'),
+    path('stats/cache/', views.cache_stats, name='cache_stats'),
     path('faculty/courses/', views.manage_courses, name='manage_courses'),
     path('faculty/course/<int:course_id>/students/', views.course_students, name='course_students'),
     path('faculty/course/<int:course_id>/assignments/', views.course_assignments, name='course_assignments'),
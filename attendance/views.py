@@ -10,15 +10,21 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from datetime import date, datetime, timedelta
-from .models import User, Student, Faculty, Course, AttendanceSession, AttendanceRecord, Assignment, Grade, Notice, AssignmentSubmission, Resource, Notification
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q
-from django.core.mail import send_mail
-import csv
+from .models import User, Student, Faculty, Course, AttendanceSession, AttendanceRecord, AttendanceSummary, Assignment, Grade, Notice, AssignmentSubmission, Resource, Notification, AttendanceReport, StudentImport, _as_bool
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.db import transaction
+from django.db.models import Avg, Prefetch, Q, Sum
+from django.core.mail import EmailMessage
 from django.conf import settings
 import os
 from .forms import LoginForm, PasswordChangeForm, PasswordResetForm, SetPasswordForm
-from itertools import chain
+from . import activity, cache, chat, checkin, imports, mail, reports, search
+from .qr import enqueue_session_qr, qr_code_url
+from .xlsx import stream_workbook
+from .live import annotate_counts
+from .notifications import (
+    notification_groups, notify_course, read_course_notification, read_notification, recent_notifications, recount_unread
+)
 from operator import attrgetter
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
@@ -28,11 +34,17 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.views import PasswordResetView, PasswordResetDoneView, PasswordResetConfirmView, PasswordResetCompleteView
 from django.utils.crypto import get_random_string
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
 import logging
 from django.views.decorators.http import require_http_methods
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+
+# Seconds between keepalive comments on an idle notification stream
+SSE_KEEPALIVE = 15
+# Attendance rows fetched per query while exporting
+EXPORT_CHUNK_SIZE = 2000
 
 # Get logger for the attendance app
 logger = logging.getLogger('attendance')
@@ -181,9 +193,11 @@ def student_dashboard(request):
         ).order_by('-created_at')[:5]
         
         # Calculate overall attendance
-        attendance_records = AttendanceRecord.objects.filter(student=student)
-        total_sessions = attendance_records.count()
-        present_sessions = attendance_records.filter(status=True).count()
+        totals = AttendanceSummary.objects.filter(student=student).aggregate(
+            total=Sum('total'), present=Sum('present')
+        )
+        total_sessions = totals['total'] or 0
+        present_sessions = totals['present'] or 0
         attendance_percentage = (present_sessions / total_sessions * 100) if total_sessions > 0 else 0
         
         # Get pending assignments
@@ -200,19 +214,21 @@ def student_dashboard(request):
         ).select_related('assignment').order_by('-submitted_at')[:5]
         
         # Get grades for all courses
-        course_grades = []
-        for course in courses:
-            submissions = AssignmentSubmission.objects.filter(
+        average_marks = cache.get_or_compute(
+            'student_course_grades', [course.id for course in courses],
+            lambda: dict(AssignmentSubmission.objects.filter(
                 student=student,
-                assignment__course=course,
+                assignment__course__in=courses,
                 marks__isnull=False
-            )
-            if submissions.exists():
-                avg_grade = sum(sub.marks for sub in submissions) / submissions.count()
-                course_grades.append({
-                    'course': course,
-                    'grade': round(avg_grade, 2)
-                })
+            ).values('assignment__course_id').annotate(
+                average=Avg('marks')
+            ).values_list('assignment__course_id', 'average').order_by()),
+            student.id
+        )
+        course_grades = [
+            {'course': course, 'grade': round(average_marks[course.id], 2)}
+            for course in courses if course.id in average_marks
+        ]
         
         context = {
             'student': student,
@@ -243,18 +259,25 @@ def faculty_dashboard(request):
         courses = Course.objects.filter(faculty=faculty)
         
         # Calculate statistics
-        total_courses = courses.count()
-        total_students = Student.objects.filter(courses__in=courses).distinct().count()
-        active_sessions = AttendanceSession.objects.filter(
-            course__in=courses,
-            date=timezone.now().date()
-        ).count()
+        today = timezone.now().date()
+        
+        def compute_stats():
+            return {
+                'total_students': Student.objects.filter(courses__in=courses).distinct().count(),
+                'active_sessions': AttendanceSession.objects.filter(course__in=courses, date=today).count(),
+                # Pending tasks (ungraded assignments)
+                'pending_tasks': AssignmentSubmission.objects.filter(
+                    assignment__course__in=courses,
+                    marks__isnull=True
+                ).count(),
+            }
         
-        # Get pending tasks (ungraded assignments)
-        pending_tasks = AssignmentSubmission.objects.filter(
-            assignment__course__in=courses,
-            marks__isnull=True
-        ).count()
+        course_ids = list(courses.values_list('id', flat=True))
+        stats = cache.get_or_compute('faculty_dashboard', course_ids, compute_stats, faculty.id, today)
+        total_courses = len(course_ids)
+        total_students = stats['total_students']
+        active_sessions = stats['active_sessions']
+        pending_tasks = stats['pending_tasks']
         
         # Get notices for faculty's courses and general notices
         notices = Notice.objects.filter(
@@ -262,25 +285,7 @@ def faculty_dashboard(request):
         ).order_by('-created_at')[:5]
         
         # Get recent activities
-        attendance_records = AttendanceRecord.objects.filter(
-            session__course__in=courses
-        ).select_related('student__user', 'session__course').order_by('-marked_at')[:10]
-        
-        assignment_submissions = AssignmentSubmission.objects.filter(
-            assignment__course__in=courses
-        ).select_related('student__user', 'assignment').order_by('-submitted_at')[:10]
-        
-        # Combine and sort activities using a custom key function
-        def get_activity_date(activity):
-            if hasattr(activity, 'marked_at'):
-                return activity.marked_at
-            return activity.submitted_at
-        
-        recent_activities = sorted(
-            chain(attendance_records, assignment_submissions),
-            key=get_activity_date,
-            reverse=True
-        )[:10]
+        recent_activities, _ = activity.feed(course_ids, limit=10)
         
         context = {
             'faculty': faculty,
@@ -307,37 +312,13 @@ def view_all_students(request):
     faculty = request.user.faculty
     courses = Course.objects.filter(faculty=faculty)
     
-    # Get all unique students from faculty's courses
-    students = Student.objects.filter(courses__in=courses).distinct()
-    
-    # Calculate statistics for each student
-    student_stats = {}
-    for student in students:
-        # Calculate attendance percentage
-        attendance_records = AttendanceRecord.objects.filter(
-            student=student,
-            session__course__in=courses
-        )
-        total_sessions = attendance_records.count()
-        present_sessions = attendance_records.filter(status=True).count()
-        attendance_percentage = (present_sessions / total_sessions * 100) if total_sessions > 0 else 0
-        
-        # Get enrolled courses
-        enrolled_courses = courses.filter(students=student)
-        
-        student_stats[student.id] = {
-            'attendance': round(attendance_percentage, 1),
-            'courses': enrolled_courses,
-            'pending_assignments': AssignmentSubmission.objects.filter(
-                student=student,
-                assignment__course__in=courses,
-                marks__isnull=True
-            ).count()
-        }
+    # Every student in the faculty's courses, with their totals over those courses
+    students = Student.objects.enrolled_in(courses).with_roster_stats(courses).prefetch_related(
+        Prefetch('courses', queryset=courses.order_by('course_code'), to_attr='roster_courses')
+    ).order_by('student_id')
     
     context = {
         'students': students,
-        'student_stats': student_stats,
         'faculty': faculty
     }
     return render(request, 'faculty/view_all_students.html', context)
@@ -380,6 +361,9 @@ def create_session(request):
                 return JsonResponse({
                     'success': True,
                     'session_id': session.id,
+                    'session_uuid': str(session.session_uuid),
+                    'qr_code_url': qr_code_url(session),
+                    'qr_code_ready': bool(session.qr_code),
                     'students': students
                 })
             
@@ -436,7 +420,7 @@ def mark_attendance(request, session_id=None, course_id=None):
     # If session_id is provided, show the attendance form for that session
     if session_id:
         try:
-            session = AttendanceSession.objects.get(id=session_id)
+            session = AttendanceSession.objects.select_related('course').get(id=session_id)
             course = session.course
             
             # Check if the faculty is assigned to this course
@@ -445,37 +429,42 @@ def mark_attendance(request, session_id=None, course_id=None):
                 return redirect('attendance:faculty_dashboard')
             
             # Get all students enrolled in the course
-            students = course.students.all()
+            students = course.students.select_related('user')
             
             # Get existing attendance records for this session
-            attendance_records = {}
-            for record in AttendanceRecord.objects.filter(session=session):
-                attendance_records[record.student.id] = record.status
+            attendance_records = dict(
+                AttendanceRecord.objects.filter(session=session).values_list('student_id', 'status')
+            )
             
             if request.method == 'POST':
                 # Process the attendance form submission
-                for student in students:
-                    attendance_value = request.POST.get(f'student_{student.id}')
-                    # Convert string value to boolean: '1' for present, '0' for absent
-                    status = attendance_value == '1'
-                    
-                    # Update or create attendance record
-                    AttendanceRecord.objects.update_or_create(
-                        session=session,
-                        student=student,
-                        defaults={
-                            'status': status,
-                            'marked_by': request.user.faculty
-                        }
-                    )
+                # Convert string value to boolean: '1' for present, '0' for absent
+                statuses = {
+                    student: request.POST.get(f'student_{student.id}') == '1'
+                    for student in students
+                }
+                
+                # Upsert all attendance records in one transaction
+                result = AttendanceRecord.bulk_mark(session, statuses, request.user.faculty)
+                logger.info(
+                    f"Marked attendance for session {session.id}: "
+                    f"{result['created']} created, {result['updated']} updated"
+                )
                 
                 messages.success(request, 'Attendance marked successfully')
                 return redirect('attendance:faculty_dashboard')
             
+            # Sessions from before background rendering, or whose render
+            # failed or was lost on a restart, are queued again here
+            if not session.qr_code:
+                transaction.on_commit(lambda: enqueue_session_qr(session))
+            
             context = {
                 'session': session,
                 'students': students,
                 'attendance_records': attendance_records,
+                'qr_code_url': qr_code_url(session),
+                'qr_code_ready': bool(session.qr_code),
                 'today': date.today()
             }
             
@@ -495,6 +484,45 @@ def mark_attendance(request, session_id=None, course_id=None):
     }
     return render(request, 'faculty/mark_attendance.html', context)
 
+@login_required
+@require_http_methods(["POST"])
+def self_check_in(request, session_uuid):
+    """Mark the logged-in student present by scanning a session's QR code"""
+    if request.user.user_type != 'student':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    try:
+        student = request.user.student
+    except Student.DoesNotExist:
+        return JsonResponse({'error': 'Student profile not found'}, status=404)
+    
+    result = checkin.checkin_buffer.check_in(session_uuid, student.id)
+    if result == checkin.INVALID_SESSION:
+        return JsonResponse({'error': 'Session not found or no longer active', 'status': result}, status=404)
+    if result == checkin.NOT_ENROLLED:
+        return JsonResponse({'error': 'You are not enrolled in this course', 'status': result}, status=403)
+    
+    return JsonResponse({
+        'success': True,
+        'status': result,
+        'message': 'Already checked in' if result == checkin.DUPLICATE else 'Checked in successfully'
+    })
+
+@login_required
+def session_qr_code(request, session_id):
+    """Poll whether a session's QR code has been rendered yet"""
+    if request.user.user_type != 'faculty':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    session = get_object_or_404(AttendanceSession, id=session_id, course__faculty=request.user.faculty)
+    if not session.qr_code:
+        # Re-queue renders that failed or were lost; one in flight is reused
+        transaction.on_commit(lambda: enqueue_session_qr(session))
+    return JsonResponse({
+        'ready': bool(session.qr_code),
+        'url': qr_code_url(session)
+    })
+
 @login_required
 def view_attendance(request):
     if request.user.user_type != 'student':
@@ -504,22 +532,21 @@ def view_attendance(request):
     student = request.user.student
     course_id = request.GET.get('course')
     
+    summaries = AttendanceSummary.objects.filter(student=student)
+    attendance_records = AttendanceRecord.objects.filter(
+        student=student
+    ).select_related('session__course', 'marked_by__user').order_by('-session__date')
     if course_id:
         course = get_object_or_404(Course, id=course_id)
-        attendance_records = AttendanceRecord.objects.filter(
-            student=student,
-            session__course=course
-        ).order_by('-session__date')
-    else:
-        attendance_records = AttendanceRecord.objects.filter(
-            student=student
-        ).order_by('-session__date')
+        attendance_records = attendance_records.filter(session__course=course)
+        summaries = summaries.filter(course=course)
     
     courses = Course.objects.filter(students=student)
     
     # Calculate attendance statistics
-    total_sessions = attendance_records.count()
-    present_count = attendance_records.filter(status=True).count()
+    totals = summaries.aggregate(total=Sum('total'), present=Sum('present'))
+    total_sessions = totals['total'] or 0
+    present_count = totals['present'] or 0
     absent_count = total_sessions - present_count
     attendance_percentage = (present_count / total_sessions * 100) if total_sessions > 0 else 0
     
@@ -883,14 +910,14 @@ def get_course_students(request, course_id):
     
     try:
         course = Course.objects.get(id=course_id, faculty=request.user.faculty)
-        students = []
-        for student in course.students.all():
-            students.append({
-                'id': student.id,
-                'name': f"{student.user.first_name} {student.user.last_name}",
-                'student_id': student.student_id,
-                'email': student.user.email
-            })
+        students = [{
+            'id': student.id,
+            'name': f"{student.user.first_name} {student.user.last_name}",
+            'student_id': student.student_id,
+            'email': student.user.email,
+            'attendance_percentage': student.attendance_percentage,
+            'pending_submissions': student.pending_submissions
+        } for student in Student.objects.enrolled_in([course]).with_roster_stats([course]).order_by('student_id')]
         
         return JsonResponse({
             'success': True,
@@ -915,6 +942,7 @@ def add_student_to_course(request, course_id):
     try:
         student = Student.objects.get(student_id=student_id)
         course.students.add(student)
+        recount_unread([student.user])
         return JsonResponse({
             'success': True,
             'student': {
@@ -942,6 +970,7 @@ def remove_student_from_course(request, course_id, student_id):
             return JsonResponse({'error': 'Student is not enrolled in this course'}, status=400)
         
         course.students.remove(student)
+        recount_unread([student.user])
         return JsonResponse({
             'success': True,
             'message': f'Student {student.user.get_full_name()} has been removed from {course.name}'
@@ -962,11 +991,8 @@ def search_students(request):
     if len(query) < 2:
         return JsonResponse({'students': []})
     
-    students = Student.objects.filter(
-        Q(user__first_name__icontains=query) |
-        Q(user__last_name__icontains=query) |
-        Q(student_id__icontains=query)
-    )[:10]
+    # Ranked matches from the full-text index, users included
+    students = search.find_students(query, limit=10)
     
     results = [{
         'id': student.id,
@@ -1018,107 +1044,30 @@ def export_attendance(request, session_id=None):
         return JsonResponse({'error': 'Access denied'}, status=403)
     
     try:
-        # Create a new workbook and select the active sheet
-        wb = Workbook()
-        ws = wb.active
-        
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        centered = Alignment(horizontal="center")
-        
         if session_id:
             # Export attendance for a specific session
-            session = AttendanceSession.objects.get(id=session_id, course__faculty=request.user.faculty)
-            
-            # Set worksheet title
-            ws.title = f"Attendance {session.date}"
-            
-            # Write headers
-            headers = ['Student ID', 'Name', 'Status', 'Marked By', 'Marked At']
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = centered
-            
-            # Get records
-            records = AttendanceRecord.objects.filter(session=session).select_related(
-                'student', 'student__user', 'marked_by', 'marked_by__user'
+            session = AttendanceSession.objects.select_related('course').get(
+                id=session_id, course__faculty=request.user.faculty
             )
-            
-            # Write data
-            for row, record in enumerate(records, 2):
-                marked_by = record.marked_by.user.get_full_name() if record.marked_by else 'System'
-                marked_at = record.marked_at.strftime('%d-%m-%Y %I:%M %p') if record.marked_at else 'N/A'
-                
-                ws.cell(row=row, column=1, value=record.student.student_id)
-                ws.cell(row=row, column=2, value=record.student.user.get_full_name())
-                ws.cell(row=row, column=3, value='Present' if record.status else 'Absent')
-                ws.cell(row=row, column=4, value=marked_by)
-                ws.cell(row=row, column=5, value=marked_at)
-            
+            title = f"Attendance {session.date}"
+            headers = ['Student ID', 'Name', 'Status', 'Marked By', 'Marked At']
+            records = AttendanceRecord.objects.filter(session=session)
             filename = f"attendance_{session.course.course_code}_{session.date}.xlsx"
         else:
             # Export all attendance records
-            ws.title = "All Attendance Records"
-            
-            # Write headers
+            title = "All Attendance Records"
             headers = ['Course', 'Date', 'Student ID', 'Name', 'Status', 'Marked By', 'Marked At']
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = centered
-            
-            # Get records
             records = AttendanceRecord.objects.filter(
                 session__course__faculty=request.user.faculty
-            ).select_related(
-                'session', 'session__course',
-                'student', 'student__user',
-                'marked_by', 'marked_by__user'
             ).order_by('session__course__course_code', '-session__date')
-            
-            # Write data
-            for row, record in enumerate(records, 2):
-                marked_by = record.marked_by.user.get_full_name() if record.marked_by else 'System'
-                marked_at = record.marked_at.strftime('%d-%m-%Y %I:%M %p') if record.marked_at else 'N/A'
-                session_date = record.session.date.strftime('%d-%m-%Y')
-                
-                ws.cell(row=row, column=1, value=record.session.course.course_code)
-                ws.cell(row=row, column=2, value=session_date)
-                ws.cell(row=row, column=3, value=record.student.student_id)
-                ws.cell(row=row, column=4, value=record.student.user.get_full_name())
-                ws.cell(row=row, column=5, value='Present' if record.status else 'Absent')
-                ws.cell(row=row, column=6, value=marked_by)
-                ws.cell(row=row, column=7, value=marked_at)
-            
             filename = "attendance_all_courses.xlsx"
         
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create the response
-        response = HttpResponse(
+        rows = _attendance_export_rows(records, with_session=not session_id)
+        response = StreamingHttpResponse(
+            _iterate_in_request_thread(stream_workbook(title, headers, rows)),
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Save the workbook to the response
-        wb.save(response)
         return response
         
     except AttendanceSession.DoesNotExist:
@@ -1126,6 +1075,47 @@ def export_attendance(request, session_id=None):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def _attendance_export_rows(records, with_session):
+    """Spreadsheet rows for AttendanceRecords, fetched in chunks as plain tuples"""
+    fields = [
+        'student__student_id', 'student__user__first_name', 'student__user__last_name', 'status',
+        'marked_by_id', 'marked_by__user__first_name', 'marked_by__user__last_name', 'marked_at'
+    ]
+    if with_session:
+        fields = ['session__course__course_code', 'session__date'] + fields
+    
+    for values in records.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        if with_session:
+            course_code, session_date, *values = values
+        student_id, first_name, last_name, status, marked_by_id, marker_first, marker_last, marked_at = values
+        row = [
+            student_id,
+            f'{first_name} {last_name}'.strip(),
+            'Present' if _as_bool(status) else 'Absent',
+            f'{marker_first} {marker_last}'.strip() if marked_by_id else 'System',
+            marked_at.strftime('%d-%m-%Y %I:%M %p') if marked_at else 'N/A'
+        ]
+        if with_session:
+            row = [course_code, session_date.strftime('%d-%m-%Y')] + row
+        yield row
+
+async def _iterate_in_request_thread(iterator):
+    """Serve a sync iterator from a StreamingHttpResponse without buffering it.
+
+    Under ASGI Django reads a sync iterator into a list before sending it.
+    Pulling one chunk at a time with sync_to_async keeps memory bounded and
+    keeps the iterator, and its database cursor, on the request's thread.
+    """
+    done = object()
+    iterator = iter(iterator)
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await pull(iterator, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
 @login_required
 def send_attendance_notifications(request, session_id):
     if request.user.user_type != 'faculty':
@@ -1135,17 +1125,19 @@ def send_attendance_notifications(request, session_id):
         return JsonResponse({'error': 'Invalid method'}, status=405)
     
     try:
-        session = AttendanceSession.objects.get(id=session_id, course__faculty=request.user.faculty)
-        absent_records = AttendanceRecord.objects.filter(session=session, status=False).select_related('student', 'student__user')
+        session = AttendanceSession.objects.select_related('course', 'created_by__user').get(
+            id=session_id,
+            course__faculty=request.user.faculty
+        )
+        absent_records = AttendanceRecord.objects.filter(session=session, status=False).select_related('student__user')
+        college_name = getattr(settings, 'COLLEGE_NAME', 'College Management System')
         
-        notification_count = 0
-        for record in absent_records:
-            try:
-                send_mail(
-                    subject=f'Absence Notification - {session.course.code}',
-                    message=f'''Dear {record.student.user.get_full_name()},
+        emails = [
+            EmailMessage(
+                subject=f'Absence Notification - {session.course.course_code}',
+                body=f'''Dear {record.student.user.get_full_name()},
 
-This is to inform you that you were marked absent for {session.course.code} - {session.course.name} on {session.date}.
+This is to inform you that you were marked absent for {session.course.course_code} - {session.course.name} on {session.date}.
 
 Class Details:
 - Date: {session.date}
@@ -1155,21 +1147,35 @@ Class Details:
 Please contact your faculty if you believe this was marked in error.
 
 Best regards,
-{settings.COLLEGE_NAME}''',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[record.student.user.email],
-                )
-                notification_count += 1
-            except Exception as e:
-                print(f"Failed to send email to {record.student.user.email}: {str(e)}")
+{college_name}''',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[record.student.user.email],
+            ) for record in absent_records
+        ]
+        
+        # Delivered by the mail workers; the page can poll the job for progress
+        job_id = mail.enqueue(emails, queued_by=request.user)
+        logger.info(f'Queued {len(emails)} absence email(s) for session {session.id} as job {job_id}')
         
         return JsonResponse({
             'success': True,
-            'message': f'Sent {notification_count} notification(s)'
+            'job_id': job_id,
+            'status_url': reverse('attendance:mail_job_status', args=[job_id]),
+            'message': f'Sending {len(emails)} notification(s)'
         })
     except AttendanceSession.DoesNotExist:
         return JsonResponse({'error': 'Session not found'}, status=404)
 
+@login_required
+def mail_job_status(request, job_id):
+    if request.user.user_type != 'faculty':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    status = mail.job_status(job_id, queued_by=request.user)
+    if status is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(status)
+
 @login_required
 def chat_room(request, course_id):
     course = get_object_or_404(Course, id=course_id)
@@ -1188,6 +1194,27 @@ def chat_room(request, course_id):
     }
     return render(request, 'chat/room.html', context)
 
+@login_required
+def chat_history(request, course_id):
+    """Older chat messages of a course, paginated by message id"""
+    if not chat.can_join(request.user, course_id):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    try:
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        limit = int(request.GET.get('limit', chat.HISTORY_SIZE))
+        if limit < 1:
+            raise ValueError(limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid pagination parameters'}, status=400)
+    limit = min(limit, 200)
+    
+    history = chat.history(course_id, before=before, limit=limit)
+    return JsonResponse({
+        'messages': history,
+        'next_before': history[0]['id'] if len(history) == limit else None
+    })
+
 @login_required
 def upload_resource(request, course_id):
     if request.user.user_type != 'faculty':
@@ -1226,16 +1253,14 @@ def upload_resource(request, course_id):
                 uploaded_by=request.user
             )
             
-            # Send notification to all students in the course
-            students = course.students.all()
-            for student in students:
-                Notification.objects.create(
-                    user=student.user,
-                    title=f'New Resource: {title}',
-                    message=f'A new resource has been uploaded in {course.name}',
-                    notification_type='resource',
-                    related_id=resource.id
-                )
+            # Notify all students in the course
+            notify_course(
+                course,
+                title=f'New Resource: {title}',
+                message=f'A new resource has been uploaded in {course.name}',
+                notification_type='resource',
+                related_id=resource.id
+            )
             
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -1286,8 +1311,8 @@ def delete_resource(request, resource_id):
 
 @login_required
 def notifications(request):
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:50]
-    unread_count = notifications.filter(read=False).count()
+    notifications = recent_notifications(request.user)
+    unread_count = request.user.unread_notifications
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
@@ -1296,7 +1321,8 @@ def notifications(request):
                 'title': n.title,
                 'message': n.message,
                 'created_at': n.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'read': n.read
+                'read': n.read,
+                'mark_read_url': n.mark_read_url
             } for n in notifications],
             'unread_count': unread_count
         })
@@ -1312,12 +1338,54 @@ def mark_notification_read(request, notification_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Invalid method'}, status=405)
     
-    notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.read = True
-    notification.save()
+    if not read_notification(request.user, notification_id):
+        return JsonResponse({'error': 'Notification not found'}, status=404)
     
     return JsonResponse({'success': True})
 
+@login_required
+def mark_course_notification_read(request, notification_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+    
+    if not read_course_notification(request.user, notification_id):
+        return JsonResponse({'error': 'Notification not found'}, status=404)
+    
+    return JsonResponse({'success': True})
+
+async def notification_stream(request):
+    """Server-sent events fallback for browsers that can't use the
+    notifications WebSocket; sends the same events as NotificationConsumer"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    groups = await sync_to_async(notification_groups)(user)
+    channel_layer = get_channel_layer()
+    
+    async def events():
+        channel = await channel_layer.new_channel()
+        for group in groups:
+            await channel_layer.group_add(group, channel)
+        try:
+            yield f"data: {json.dumps({'type': 'unread_count', 'unread_count': user.unread_notifications})}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(channel_layer.receive(channel), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"data: {json.dumps(message['event'])}\n\n"
+        finally:
+            for group in groups:
+                await channel_layer.group_discard(group, channel)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def generate_report(request):
     if not request.user.is_superuser:
@@ -1327,84 +1395,27 @@ def generate_report(request):
     report_type = request.GET.get('type')
     course_id = request.GET.get('course')
     
-    if report_type == 'attendance':
-        course = get_object_or_404(Course, id=course_id)
-        records = AttendanceRecord.objects.filter(session__course=course)
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="attendance_report_{course.code}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Student ID', 'Name', 'Total Sessions', 'Present', 'Absent', 'Percentage'])
+    if report_type in reports.REPORT_TYPES:
+        course = None
+        if report_type != 'performance':
+            course = get_object_or_404(Course, id=course_id)
         
-        students = course.students.all()
-        for student in students:
-            total = records.filter(student=student).count()
-            present = records.filter(student=student, status=True).count()
-            absent = total - present
-            percentage = (present / total * 100) if total > 0 else 0
-            
-            writer.writerow([
-                student.student_id,
-                student.user.get_full_name(),
-                total,
-                present,
-                absent,
-                f"{percentage:.2f}%"
-            ])
-        
-        return response
-    
-    elif report_type == 'grades':
-        course = get_object_or_404(Course, id=course_id)
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="grades_report_{course.code}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Student ID', 'Name', 'Grade', 'Percentage', 'Remarks'])
-        
-        grades = Grade.objects.filter(course=course).select_related('student', 'student__user')
-        for grade in grades:
-            writer.writerow([
-                grade.student.student_id,
-                grade.student.user.get_full_name(),
-                grade.grade,
-                grade.percentage,
-                grade.remarks
-            ])
-        
-        return response
-    
-    elif report_type == 'performance':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="overall_performance_report.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Student ID', 'Name', 'Department', 'Average Grade', 'Overall Attendance', 'Total Courses'])
-        
-        students = Student.objects.all()
-        for student in students:
-            grades = Grade.objects.filter(student=student)
-            attendance_records = AttendanceRecord.objects.filter(student=student)
-            
-            total_percentage = sum(float(g.percentage) for g in grades if g.percentage)
-            avg_grade = total_percentage / grades.count() if grades.exists() else 0
-            
-            total_sessions = attendance_records.count()
-            present_sessions = attendance_records.filter(status=True).count()
-            attendance_percentage = (present_sessions / total_sessions * 100) if total_sessions > 0 else 0
-            
-            writer.writerow([
-                student.student_id,
-                student.user.get_full_name(),
-                student.department,
-                f"{avg_grade:.2f}%",
-                f"{attendance_percentage:.2f}%",
-                student.course_set.count()
-            ])
-        
-        return response
+        start_date, end_date = reports.default_date_range(course)
+        try:
+            if request.GET.get('start'):
+                start_date = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+            if request.GET.get('end'):
+                end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format'}, status=400)
+        if start_date > end_date:
+            return JsonResponse({'error': 'Start date must not be after end date'}, status=400)
+        
+        report, reused = reports.request_report(request.user, report_type, course, start_date, end_date)
+        logger.info(f'Report {report.id} ({report.params_key}) requested by {request.user.username}, reused={reused}')
+        data = _report_status(report)
+        data['reused'] = reused
+        return JsonResponse(data, status=200 if report.status == AttendanceReport.DONE else 202)
     
     courses = Course.objects.all()
     context = {
@@ -1412,6 +1423,44 @@ def generate_report(request):
     }
     return render(request, 'admin/generate_report.html', context)
 
+def _report_status(report):
+    data = reports.report_status(report)
+    data['status_url'] = reverse('attendance:report_status', args=[report.id])
+    if report.status == AttendanceReport.DONE and report.report_file:
+        data['download_url'] = reverse('attendance:download_report', args=[report.id])
+    return data
+
+@login_required
+def report_status(request, report_id):
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    report = AttendanceReport.objects.filter(id=report_id).first()
+    if report is None:
+        return JsonResponse({'error': 'Report not found'}, status=404)
+    return JsonResponse(_report_status(report))
+
+@login_required
+def download_report(request, report_id):
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    report = AttendanceReport.objects.filter(id=report_id, status=AttendanceReport.DONE).first()
+    if report is None or not report.report_file:
+        return JsonResponse({'error': 'Report not found or not ready'}, status=404)
+    return FileResponse(
+        report.report_file.open('rb'),
+        as_attachment=True,
+        filename=os.path.basename(report.report_file.name),
+        content_type='text/csv'
+    )
+
+@login_required
+def cache_stats(request):
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return JsonResponse(cache.stats())
+
 @login_required
 def add_course(request):
     if request.user.user_type != 'faculty':
@@ -1476,6 +1525,7 @@ def add_student(request):
                         
                         # Add existing student to course
                         course.students.add(existing_user.student)
+                        recount_unread([existing_user])
                         return JsonResponse({
                             'success': True,
                             'student': {
@@ -1526,6 +1576,7 @@ def add_student(request):
                 try:
                     course = Course.objects.get(id=course_id, faculty=request.user.faculty)
                     course.students.add(student)
+                    recount_unread([user])
                 except Course.DoesNotExist:
                     # Delete the created user and student if course doesn't exist
                     user.delete()  # This will cascade delete the student profile
@@ -1553,6 +1604,61 @@ def add_student(request):
     # If not POST, return error
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
+def _import_status(job):
+    data = imports.import_status(job)
+    data['status_url'] = reverse('attendance:import_status', args=[job.id])
+    if job.row_errors:
+        data['errors_url'] = reverse('attendance:import_errors', args=[job.id])
+    return data
+
+@login_required
+def import_students(request):
+    """Queue a CSV/XLSX file of students for import; poll status_url for the outcome"""
+    if request.user.user_type != 'faculty':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+    
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({'error': 'Choose a CSV or XLSX file to import', 'field': 'file'}, status=400)
+    if not imports.is_supported(upload.name):
+        return JsonResponse({'error': 'Only CSV and XLSX files can be imported', 'field': 'file'}, status=400)
+    
+    course = None
+    course_id = request.POST.get('course_id')
+    if course_id:
+        course = Course.objects.filter(id=course_id, faculty=request.user.faculty).first()
+        if course is None:
+            return JsonResponse({
+                'error': 'Course not found or you do not have permission to add students to it',
+                'field': 'course_id'
+            }, status=404)
+    
+    job = imports.request_import(request.user, course, upload)
+    logger.info(f'Student import {job.id} ({upload.name}) queued by {request.user.username}')
+    return JsonResponse(_import_status(job), status=202)
+
+@login_required
+def import_status(request, import_id):
+    job = StudentImport.objects.filter(id=import_id, uploaded_by=request.user).first()
+    if job is None:
+        return JsonResponse({'error': 'Import not found'}, status=404)
+    return JsonResponse(_import_status(job))
+
+@login_required
+def import_errors(request, import_id):
+    """The rows an import rejected, as CSV"""
+    job = StudentImport.objects.filter(id=import_id, uploaded_by=request.user).first()
+    if job is None:
+        return JsonResponse({'error': 'Import not found'}, status=404)
+    response = StreamingHttpResponse(
+        reports.csv_lines(imports.ERROR_HEADER, imports.import_error_rows(job)), content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="student_import_{job.id}_errors.csv"'
+    return response
+
 @login_required
 def manage_grades(request):
     if request.user.user_type != 'faculty':
@@ -1689,32 +1795,11 @@ def course_students(request, course_id):
         return redirect('attendance:login')
     
     course = get_object_or_404(Course, id=course_id, faculty=request.user.faculty)
-    students = course.students.all()
-    
-    # Calculate attendance statistics for each student
-    attendance_stats = {}
-    for student in students:
-        total_sessions = AttendanceRecord.objects.filter(
-            session__course=course,
-            student=student
-        ).count()
-        
-        if total_sessions > 0:
-            present_count = AttendanceRecord.objects.filter(
-                session__course=course,
-                student=student,
-                status=True
-            ).count()
-            attendance_percentage = (present_count / total_sessions) * 100
-        else:
-            attendance_percentage = 0
-            
-        attendance_stats[student.id] = round(attendance_percentage, 1)
+    students = Student.objects.enrolled_in([course]).with_roster_stats([course]).order_by('student_id')
     
     context = {
         'course': course,
-        'students': students,
-        'attendance_stats': attendance_stats
+        'students': students
     }
     return render(request, 'faculty/course_students.html', context)
 
@@ -1735,14 +1820,13 @@ def password_reset_request(request):
                     reverse('attendance:password_reset_confirm', kwargs={'uidb64': uid, 'token': token})
                 )
                 
-                # Send email
-                send_mail(
+                # Queue the email; the page doesn't wait for the SMTP server
+                mail.enqueue([EmailMessage(
                     'Password Reset Request',
                     f'Please click the following link to reset your password: {reset_url}',
                     settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=False
-                )
+                    [email]
+                )])
                 
                 return redirect('attendance:password_reset_done')
             except User.DoesNotExist:
@@ -1932,24 +2016,20 @@ def view_active_sessions(request):
     faculty = request.user.faculty
     today = timezone.now().date()
     
-    # Get all active sessions for faculty's courses
-    active_sessions = AttendanceSession.objects.filter(
+    # Get all active sessions for faculty's courses, with their attendance counts
+    active_sessions = annotate_counts(AttendanceSession.objects.filter(
         course__faculty=faculty,
         date=today
-    ).select_related('course')
+    ).select_related('course'))
     
     # Get attendance statistics for each session
     session_stats = {}
     for session in active_sessions:
-        total_students = session.course.students.count()
-        marked_attendance = AttendanceRecord.objects.filter(session=session).count()
-        present_students = AttendanceRecord.objects.filter(session=session, status=True).count()
-        
         session_stats[session.id] = {
-            'total_students': total_students,
-            'marked_attendance': marked_attendance,
-            'present_students': present_students,
-            'pending_students': total_students - marked_attendance
+            'total_students': session.total_students,
+            'marked_attendance': session.marked_count,
+            'present_students': session.present_count,
+            'pending_students': session.total_students - session.marked_count
         }
     
     context = {
@@ -2110,44 +2190,34 @@ def student_attendance(request, student_id):
             messages.error(request, 'Student not found in your courses')
             return redirect('attendance:faculty_dashboard')
         
-        # Get attendance records for all courses
-        attendance_records = AttendanceRecord.objects.filter(
+        # The latest record of each course and date, newest first
+        latest_records = AttendanceRecord.objects.filter(
             student=student,
             session__course__in=courses
-        ).select_related('session__course', 'marked_by__user')
-        
-        # Use values to get unique dates first
-        unique_dates = attendance_records.values_list('session__date', flat=True).distinct()
-        
-        # For each unique date, get the latest record
-        latest_records = []
-        for date in unique_dates:
-            latest_record = attendance_records.filter(
-                session__date=date
-            ).order_by('-marked_at').first()
-            if latest_record:
-                latest_records.append(latest_record)
-        
-        # Sort the records by date
-        latest_records.sort(key=lambda x: x.session.date, reverse=True)
-        
-        # Calculate attendance statistics per course
-        course_stats = {}
-        student_courses = courses.filter(students=student)
-        for course in student_courses:
-            course_records = [record for record in latest_records if record.session.course == course]
-            total = len(course_records)
-            present = sum(1 for record in course_records if record.status)
-            course_stats[course.id] = {
-                'total': total,
-                'present': present,
-                'absent': total - present,
-                'percentage': round((present / total * 100) if total > 0 else 0, 1)
-            }
+        ).latest_per_course_date().select_related('session__course', 'marked_by__user').order_by(
+            '-session__date', 'session__course__course_code'
+        )
+        
+        # Calculate attendance statistics per course in one pass over them
+        student_courses = list(courses.filter(students=student))
+        course_stats = {
+            course.id: {'total': 0, 'present': 0, 'records': []}
+            for course in student_courses
+        }
+        for record in latest_records:
+            stats = course_stats.get(record.session.course_id)
+            if stats is None:
+                continue
+            record.status = _as_bool(record.status)
+            stats['total'] += 1
+            stats['present'] += 1 if record.status else 0
+            stats['records'].append(record)
+        for stats in course_stats.values():
+            stats['absent'] = stats['total'] - stats['present']
+            stats['percentage'] = round((stats['present'] / stats['total'] * 100) if stats['total'] > 0 else 0, 1)
         
         context = {
             'student': student,
-            'attendance_records': latest_records,
             'course_stats': course_stats,
             'faculty': faculty,
             'courses': student_courses
@@ -2217,33 +2287,24 @@ def view_recent_activities(request):
         return redirect('attendance:login')
     
     faculty = request.user.faculty
-    courses = Course.objects.filter(faculty=faculty)
+    course_ids = list(Course.objects.filter(faculty=faculty).values_list('id', flat=True))
     
-    # Get recent attendance records with all necessary relations
-    attendance_records = AttendanceRecord.objects.filter(
-        session__course__in=courses
-    ).select_related(
-        'student__user',
-        'session__course'
-    ).order_by('-marked_at')[:20]
-    
-    # Get recent assignment submissions with all necessary relations
-    assignment_submissions = AssignmentSubmission.objects.filter(
-        assignment__course__in=courses
-    ).select_related(
-        'student__user',
-        'assignment__course'
-    ).order_by('-submitted_at')[:20]
-    
-    # Combine and sort activities
-    recent_activities = sorted(
-        chain(attendance_records, assignment_submissions),
-        key=lambda x: x.marked_at if hasattr(x, 'marked_at') else x.submitted_at,
-        reverse=True
-    )[:30]  # Get top 30 most recent activities
+    # One page of the activity feed; infinite scroll asks for the next one
+    # with ?before=<cursor>
+    try:
+        recent_activities, next_cursor = activity.feed(course_ids, request.GET.get('before'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'html': render_to_string('faculty/_activity_items.html', {'recent_activities': recent_activities}, request=request),
+            'next_cursor': next_cursor
+        })
     
     context = {
         'recent_activities': recent_activities,
+        'next_cursor': next_cursor,
         'faculty': faculty
     }
     return render(request, 'faculty/recent_activities.html', context)
@@ -2269,12 +2330,19 @@ def verify_enrollment(request, course_id):
             logger.warning("Student ID not provided in request")
             return JsonResponse({'error': 'Student ID is required'}, status=400)
             
-        student = Student.objects.filter(student_id=student_id).first()
+        student = Student.objects.select_related('user').filter(student_id=student_id).first()
         if not student:
             logger.info(f"Student with ID {student_id} not found")
+            # Closest matches from the search index, e.g. for a mistyped ID
+            suggestions = [{
+                'id': match.id,
+                'name': match.user.get_full_name(),
+                'student_id': match.student_id
+            } for match in search.find_students(student_id, limit=5)]
             return JsonResponse({
                 'exists': False,
-                'message': 'Student not found'
+                'message': 'Student not found',
+                'suggestions': suggestions
             })
             
         is_enrolled = course.students.filter(id=student.id).exists()
@@ -113,6 +113,21 @@ DATABASES = {
     }
 }
 
+# Computed results (course stats, dashboard aggregates) are cached under keys
+# that include each course's data_version, so entries never need to expire.
+# The local-memory cache is per process; point this at a shared backend
+# (e.g. Redis) to share entries between Daphne processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'college-management',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -139,6 +154,8 @@ USE_TZ = True
 # Media files (Uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Generated reports and uploaded class lists; never served directly
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'private_media')
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
@@ -174,8 +191,14 @@ LOGOUT_REDIRECT_URL = 'attendance:login'
 # Channels Configuration
 ASGI_APPLICATION = 'college_management.asgi.application'
 
+# The SQLite layer is shared by every Daphne process on this host, so groups
+# fan out across processes. For a single process the in-memory layer is enough:
+# CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'attendance.channel_layers.SQLiteChannelLayer',
+        'CONFIG': {
+            'path': BASE_DIR / 'channels.sqlite3',
+        },
     }
-} 
\ No newline at end of file
+}